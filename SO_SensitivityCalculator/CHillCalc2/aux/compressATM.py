@@ -0,0 +1,25 @@
+#python Version 2.7.2
+import time            as tm
+import sys             as sy
+import os
+
+import atmosphere      as at
+import log             as lg
+
+#Error bounds passed at the command line
+try:
+    maxTb   = float(sy.argv[1]) if len(sy.argv) > 1 else 1.e-2
+    maxTran = float(sy.argv[2]) if len(sy.argv) > 2 else 1.e-4
+except:
+    print
+    print 'Usage:   python aux/compressATM.py [Max Tb Error [K]] [Max Transmission Error]'
+    print 'Writes a quantized copy of src/atmFiles/BIN that Sky uses in place of the full-precision store'
+    print 'Defaults to 1e-2 K and 1e-4, which also bound the error on band-averaged Tb and transmission'
+    print
+    sy.exit(1)
+
+topDir  = '/'.join(os.path.abspath(__file__).split('/')[:-2])
+logFile = topDir+'/log/log_compressATM_%d.txt' % (int(tm.time()))
+logging = lg.Log(logFile, 1)
+
+at.Atmosphere(logging, topDir+'/src/atmFiles/').compress(maxTb, maxTran)
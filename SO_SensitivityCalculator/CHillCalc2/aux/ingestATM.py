@@ -0,0 +1,26 @@
+#python Version 2.7.2
+import multiprocessing as mp
+import time            as tm
+import sys             as sy
+import os
+
+import atmosphere      as at
+import log             as lg
+
+#Number of cores passed at the command line
+try:
+    cores = int(sy.argv[1]) if len(sy.argv) > 1 else mp.cpu_count()
+except:
+    print
+    print 'Usage:   python aux/ingestATM.py [Cores]'
+    print 'Builds or updates src/atmFiles/BIN from src/atmFiles/TXT, re-parsing only ATM files whose content changed'
+    print
+    sy.exit(1)
+
+topDir  = '/'.join(os.path.abspath(__file__).split('/')[:-2])
+logFile = topDir+'/log/log_ingestATM_%d.txt' % (int(tm.time()))
+logging = lg.Log(logFile, 1)
+
+start = tm.time()
+at.Atmosphere(logging, topDir+'/src/atmFiles/', generate=True, cores=cores)
+logging.log('Finished ATM ingest in %.1f s' % (tm.time() - start), 1)
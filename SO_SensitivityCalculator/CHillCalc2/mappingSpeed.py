@@ -8,6 +8,8 @@ import sys             as sy
 import experiment      as ex
 import calculate       as cl
 import display         as dp
+import physics         as ph
+import kernels         as kr
 import log             as lg
 
 #Convert string to bool
@@ -42,21 +44,37 @@ else:              onePWV = float(onePWV)
 specRes = float(inputDict['Resolution'])*1.e9
 fgnd    = booll(inputDict['Foregrounds'])
 corr    = booll(inputDict['Correlations'])
+seed    = str(inputDict['Seed'])
+if 'NA' in seed: seed = None
+else:            seed = int(seed)
+quad    = str(inputDict['Quadrature'])
+if 'NA' in quad: quad = None
+else:            quad = int(quad)
+if 'single' in str(inputDict['Precision']).lower(): dtype = np.float32
+else:                                               dtype = np.float64
 
 #Logging
 logFile = 'log/log_%d.txt' % (int(tm.time()))
 logging = lg.Log(logFile, verbose)
 logging.log('Logging to file "%s," printing with verbosity = %d' % (logFile, verbose), 2)
+kr.setBackend(inputDict['Kernels'], logging)
 
 #Top-level methods for multiprocessing handling
-def mp1(drr): return ex.Experiment(logging, drr, nrealize=nrel, nobs=nobs, clcDet=clcDet, elv=oneElv, pwv=onePWV, specRes=specRes, foregrounds=fgnd)
+def mp1(n):
+    #Give each realization its own random stream, so that results do not depend on which worker runs it
+    if seed is None: np.random.seed()
+    else:            np.random.seed([seed, n])
+    return ex.Experiment(logging, expIn, nrealize=nrel, nobs=nobs, clcDet=clcDet, elv=oneElv, pwv=onePWV, specRes=specRes, foregrounds=fgnd, quad=quad, dtype=dtype)
 def mp2(exp): return cl.Calculate( logging, exp, corr)
 def mp3(clc):
     chs = clc.chans; tps = clc.teles; shp = clc.shape
-    senses = np.array([[[clc.calcSensitivity( chs[i][j][k], tps[i][j][k]) for k in range(shp[2])] for j in range(shp[1])] for i in range(shp[0])])
-    optpow = np.array([[[clc.calcOpticalPower(chs[i][j][k], tps[i][j][k]) for k in range(shp[2])] for j in range(shp[1])] for i in range(shp[0])])
+    loads  = [[[clc.calcLoading(chs[i][j][k], tps[i][j][k]) for k in range(shp[2])] for j in range(shp[1])] for i in range(shp[0])]
+    senses = np.array([[[loads[i][j][k][0] for k in range(shp[2])] for j in range(shp[1])] for i in range(shp[0])])
+    optpow = np.array([[[loads[i][j][k][1] for k in range(shp[2])] for j in range(shp[1])] for i in range(shp[0])])
     clc.combineSensitivity( senses)
     clc.combineOpticalPower(optpow)
+    stats = ph.Physics().cacheStats()
+    logging.log('Spectrum cache: %d hits, %d misses, %d spectra stored' % (stats['hits'], stats['misses'], stats['size']), 2)
     return clc
 def mp4(clcs): 
     dsp = dp.Display(logging, clcs)
@@ -64,14 +82,13 @@ def mp4(clcs):
     dsp.opticalPowerTables()
 
 #Calculate mapping speed
-#experiments = [mp1(expIn) for n   in range(nrel)]
+#experiments = [mp1(n)     for n   in range(nrel)]
 #calculates  = [mp2(exp)   for exp in experiments]
 #calculates  = [mp3(clc)   for clc in calculates ]
 #mp4(calculates)
 
 p = mp.Pool(cores)
-designDirs = [expIn for n in range(nrel)]
-experiments = p.map(mp1, designDirs)
+experiments = p.map(mp1, range(nrel))
 calculates  = p.map(mp2, experiments)
 calculates  = p.map(mp3, calculates)
 mp4(calculates)
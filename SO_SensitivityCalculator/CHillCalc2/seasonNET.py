@@ -0,0 +1,81 @@
+#python Version 2.7.2
+import numpy           as np
+import time            as tm
+import sys             as sy
+import os
+
+import experiment      as ex
+import sensitivity     as sn
+import season          as ss
+import units           as un
+import kernels         as kr
+import log             as lg
+
+#Convert string to bool
+def booll(str):
+    if 'True' in str or 'true' in str: return True
+    else:                              return False
+
+#Experiment and Season Input Parameters
+try:
+    expIn = sy.argv[1]
+    sesIn = sy.argv[2]
+except:
+    print
+    print 'Usage:   python seasonNET.py [Experiment Directory] [Season File or Number of Timesteps]'
+    print 'Example: python seasonNET.py Experiments/SimonsObservatory/V3 26280'
+    print 'A season file holds one timestep per line, with PWV [mm] and elevation [deg] in the first two columns'
+    print
+    sy.exit(1)
+if os.path.isfile(sesIn): seasonFile = sesIn; nstep = None
+else:                     seasonFile = None;  nstep = int(sesIn)
+
+#Simulation Input Parameters
+params, vals = np.loadtxt('config/mappingSpeed_params.txt', unpack=True, skiprows=1, usecols=[0,1], dtype=np.str, delimiter='|')
+inputDict = {params[i].strip(): vals[i].strip() for i in range(len(params))}
+verbose = int(inputDict['Verbosity'])
+clcDet  = int(inputDict['Detectors'])
+specRes = float(inputDict['Resolution'])*1.e9
+fgnd    = booll(inputDict['Foregrounds'])
+corr    = booll(inputDict['Correlations'])
+chunk   = int(inputDict['Chunk'])
+tseries = booll(inputDict['Time Series'])
+seed    = str(inputDict['Seed'])
+if 'NA' in seed: np.random.seed()
+else:            np.random.seed(int(seed))
+
+#Logging
+logFile = 'log/log_season_%d.txt' % (int(tm.time()))
+logging = lg.Log(logFile, verbose)
+logging.log('Logging to file "%s," printing with verbosity = %d' % (logFile, verbose), 2)
+kr.setBackend(inputDict['Kernels'], logging)
+
+#Stream the season through every channel of one experiment realization
+exp  = ex.Experiment(logging, expIn, nrealize=1, nobs=1, clcDet=clcDet, specRes=specRes, foregrounds=fgnd)
+sens = sn.Sensitivity(logging, exp, corr)
+ses  = ss.Season(logging, sens, chunk=chunk)
+
+titleStr = str("%-5s | %-9s | %-15s | %-15s | %-17s | %-15s | %-15s | %-15s\n"
+               % ("Chan", "Timesteps", "PWV", "Optical Power", "Detector NET", "Array NET", "Array NET Range", "Season NET"))
+unitStr  = str("%-5s | %-9s | %-15s | %-15s | %-17s | %-15s | %-15s | %-15s\n"
+               % ("", "", "[mm]", "[pW]", "[uK-rtSec]", "[uK-rtSec]", "[uK-rtSec]", "[uK-rtSec]"))
+breakStr = "-"*135+"\n"
+for telescope in exp.telescopes:
+    for camera in telescope.cameras:
+        f = open(camera.dir+'/season.txt', 'w')
+        f.write(titleStr); f.write(breakStr); f.write(unitStr); f.write(breakStr)
+        for ch in camera.channels:
+            if tseries: tsFile = camera.dir+'/season_%s.npy.gz' % (ch.name)
+            else:       tsFile = None
+            aggs = ses.run(ch, telescope, ses.steps(wth=telescope.wth, nstep=nstep, seasonFile=seasonFile), tsFile=tsFile)
+            f.write("%-5s | %-9d | %-5.2f +/- %-5.2f | %-5.2f +/- %-5.2f | %-6.1f +/- %-6.1f | %-5.2f +/- %-5.2f | %-6.2f - %-6.2f | %-15.2f\n"
+                    % (ch.name, aggs['PWV'].n,
+                       aggs['PWV'].mean,                      aggs['PWV'].std(),
+                       aggs['Optical Power'].mean*un.WtoPw,   aggs['Optical Power'].std()*un.WtoPw,
+                       aggs['Detector NET'].mean*un.KTouK,    aggs['Detector NET'].std()*un.KTouK,
+                       aggs['Array NET'].mean*un.KTouK,       aggs['Array NET'].std()*un.KTouK,
+                       aggs['Array NET'].min*un.KTouK,        aggs['Array NET'].max*un.KTouK,
+                       aggs['Season NET']*un.KTouK))
+            f.write(breakStr)
+        f.close()
+        logging.log('Wrote season table %s' % (camera.dir+'/season.txt'), 1)
@@ -0,0 +1,277 @@
+#python Version 2.7.2
+import numpy           as np
+import glob            as gb
+import pickle          as pk
+import hashlib         as hl
+import multiprocessing as mp
+import units           as un
+import fcntl           as fc
+import os
+
+#Top-level methods for multiprocessing handling
+#Content hash of an ATM text file
+def hashATM(atmFile):
+    with open(atmFile, 'rb') as f:
+        return hl.md5(f.read()).hexdigest()
+#Frequency [GHz], brightness temperature [K], and transmission columns of an ATM text file
+def parseATM(atmFile):
+    return np.loadtxt(atmFile, usecols=[0, 2, 3], unpack=True)
+
+#Read a pickle, closing the file afterwards
+def loadPickle(path):
+    with open(path, 'rb') as f:
+        return pk.load(f)
+#Write a pickle to a temporary file and move it into place, so that concurrent readers never see a partial file
+def dumpPickle(obj, path):
+    tmpFile = path+'.%d.tmp' % (os.getpid())
+    with open(tmpFile, 'wb') as f:
+        pk.dump(obj, f)
+    os.rename(tmpFile, path)
+
+#Parsed custom ATM files, keyed on (path, modification time) and shared by every Sky in this process
+customATM = {}
+#Frequency [Hz], brightness temperature [K], and transmission of a custom ATM file, parsed once per file version
+def customSpectrum(atmFile):
+    path = os.path.abspath(atmFile)
+    key  = (path, os.path.getmtime(path))
+    if key not in customATM:
+        for old in [k for k in customATM.keys() if k[0] == path]: del customATM[old]
+        freq, temp, tran = parseATM(path)
+        customATM[key]   = (freq*un.GHzToHz, temp, tran)
+    return customATM[key]
+
+#Class for handling the binary (elevation x PWV x frequency x {Tb, transmission}) atmosphere store
+class Atmosphere:
+    def __init__(self, log, atmDir, generate=False, cores=1):
+        self.log      = log
+        self.txtDir   = atmDir+'TXT/'
+        self.binDir   = atmDir+'BIN/'
+        self.cubeFile = self.binDir+'atmCube.npy'
+        self.axesFile = self.binDir+'atmAxes.pkl'
+        self.hashFile = self.binDir+'atmHashes.pkl'
+        self.cmpFile  = self.binDir+'atmCubeQ.npy'
+        self.qntFile  = self.binDir+'atmQuant.pkl'
+        self.lockFile = self.binDir+'atm.lock'
+
+        #Pool workers may all find the store missing on a fresh checkout, so only one of them builds it while the others wait
+        compressed = self.__compressed()
+        if generate or not (compressed or self.__complete()):
+            if not os.path.exists(self.binDir):
+                try:               os.makedirs(self.binDir)
+                except OSError:    pass
+            with open(self.lockFile, 'w') as lock:
+                fc.flock(lock, fc.LOCK_EX)
+                if generate or not self.__complete(): self.ingest(cores)
+                fc.flock(lock, fc.LOCK_UN)
+            compressed = self.__compressed()
+        self.__load(compressed)
+
+    #***** Public methods *****
+    #Indices of the grid point nearest to (pwv, elev)
+    def index(self, pwv, elev):
+        try:
+            return self.__elvInd[int(round(elev, 0))], self.__pwvInd[round(pwv, 1)]
+        except KeyError:
+            raise Exception('No ATM spectrum stored for PWV = %.1f mm and elevation = %.1f deg' % (pwv, elev))
+
+    #Frequency [GHz], brightness temperature [K], and transmission at the grid point nearest to (pwv, elev)
+    def spectrum(self, pwv, elev):
+        i, j = self.index(pwv, elev)
+        spec = self.__read([i], [j], 0, len(self.freq))[0]
+        return self.freq, spec[:,0], spec[:,1]
+
+    #Brightness temperature [K] and transmission of the grid cells (i, j) resampled onto freqs [Hz], with shape (cells, freqs, 2)
+    def table(self, freqs, i, j):
+        freq = self.freq*un.GHzToHz
+        #Only read the requested cells at the stored frequencies that bracket freqs
+        lo   = max(np.searchsorted(freq, freqs[0], side='right') - 1, 0)
+        hi   = min(np.searchsorted(freq, freqs[-1], side='left') + 1, len(freq))
+        freq = freq[lo:hi]; cube = self.__read(np.array(i), np.array(j), lo, hi)
+        #Linear interpolation in the same form as np.interp, holding the end values outside of the stored range
+        ind  = np.clip(np.searchsorted(freq, freqs, side='right'), 1, len(freq)-1)
+        dx   = np.reshape(freqs - freq[ind-1], (len(freqs), 1))
+        tab  = (cube[:,ind] - cube[:,ind-1])/np.reshape(freq[ind] - freq[ind-1], (len(freqs), 1))*dx + cube[:,ind-1]
+        tab[:,freqs <= freq[0]]  = cube[:,:1]
+        tab[:,freqs >= freq[-1]] = cube[:,-1:]
+        return tab
+
+    #Lower grid indices and interpolation weights (i, wi, j, wj) for each of the (pwv, elev) pairs
+    def weights(self, pwv, elev):
+        i, wi = self.__weights(self.elvArr, elev, 'Elevation', 'deg')
+        j, wj = self.__weights(self.pwvArr, pwv,  'PWV',       'mm')
+        return i, wi, j, wj
+
+    #Grid cells (i, j) needed to interpolate at any combination of the given PWVs and elevations
+    def cells(self, pwv, elev):
+        i = self.__weights(self.elvArr, elev, 'Elevation', 'deg')[0]
+        j = self.__weights(self.pwvArr, pwv,  'PWV',       'mm' )[0]
+        iset = np.unique(np.concatenate([i, i+1])); jset = np.unique(np.concatenate([j, j+1]))
+        return [(ii, jj) for ii in iset for jj in jset]
+
+    #Bilinear interpolation at each of the (pwv, elev) pairs, given a dictionary of grid cell (i, j) -> spectrum
+    def interp(self, spec, pwv, elev):
+        i, wi, j, wj = self.weights(pwv, elev)
+        corner = lambda a, b: np.array([spec[(a[n], b[n])] for n in range(len(a))])
+        shape  = (len(wi),) + (1,)*(np.ndim(corner(i[:1], j[:1]))-1)
+        wi = np.reshape(wi, shape); wj = np.reshape(wj, shape)
+        return (1.-wi)*((1.-wj)*corner(i,j) + wj*corner(i,j+1)) + wi*((1.-wj)*corner(i+1,j) + wj*corner(i+1,j+1))
+
+    #Build or update the binary store from the AM-simulated text files, parsing only files whose content changed
+    def ingest(self, cores=1):
+        atmFiles = sorted(gb.glob(self.txtDir+'atm*.txt'))
+        if not len(atmFiles):
+            raise Exception('No ATM text files found in %s' % (self.txtDir))
+        names    = [atmFile.split('/')[-1] for atmFile in atmFiles]
+        elvPwv   = np.array([self.__parseName(atmFile) for atmFile in atmFiles])
+        elvAxis  = np.unique(np.round(elvPwv[:,0], 0))
+        pwvAxis  = np.unique(np.round(elvPwv[:,1], 1))
+        if not os.path.exists(self.binDir): os.makedirs(self.binDir)
+
+        #Pool workers cannot spawn pools of their own, so parse serially unless asked for more cores
+        if cores > 1: p = mp.Pool(cores); mapper = p.map
+        else:         mapper = map
+        hashes           = dict(zip(names, mapper(hashATM, atmFiles)))
+        oldAxes, oldHash = self.__stored()
+        if oldAxes is not None: freq = oldAxes['freq']
+        else:                   freq = parseATM(atmFiles[0])[0]
+        changed  = [n for n in range(len(names)) if oldHash.get(names[n]) != hashes[names[n]]]
+        removed  = [name for name in oldHash.keys() if name not in hashes]
+        self.log.log('Ingesting %d new or changed ATM files of %d in %s with %d cores' % (len(changed), len(names), self.txtDir, cores), 1)
+        spectra  = mapper(parseATM, [atmFiles[n] for n in changed])
+        if cores > 1: p.close(); p.join()
+        for n in range(len(changed)):
+            if len(spectra[n][0]) != len(freq) or not np.allclose(spectra[n][0], freq):
+                raise Exception('ATM file %s does not share the frequency grid of the ATM store' % (atmFiles[changed[n]]))
+
+        sameGrid = (oldAxes is not None and np.array_equal(oldAxes['elev'], elvAxis) and np.array_equal(oldAxes['pwv'], pwvAxis))
+        if sameGrid:
+            #Overwrite only the changed slices in place
+            cube = np.load(self.cubeFile, mmap_mode='r+')
+            for name in removed:
+                i, j = self.__cell(name, elvAxis, pwvAxis)
+                cube[i,j] = np.nan
+        else:
+            #Write to a temporary file and move it into place, so that concurrent readers never see a partial cube
+            tmpFile = self.cubeFile+'.%d.tmp' % (os.getpid())
+            cube    = np.lib.format.open_memmap(tmpFile, mode='w+', dtype=np.float64, shape=(len(elvAxis), len(pwvAxis), len(freq), 2))
+            cube[:] = np.nan
+            #Carry over the unchanged slices of the old store
+            if oldAxes is not None:
+                oldCube = np.load(self.cubeFile, mmap_mode='r')
+                for n in range(len(names)):
+                    if oldHash.get(names[n]) == hashes[names[n]]:
+                        i,  j  = self.__cell(names[n], elvAxis,         pwvAxis)
+                        oi, oj = self.__cell(names[n], oldAxes['elev'], oldAxes['pwv'])
+                        cube[i,j] = oldCube[oi,oj]
+                del oldCube
+        for n in range(len(changed)):
+            i, j = self.__cell(names[changed[n]], elvAxis, pwvAxis)
+            cube[i,j,:,0] = spectra[n][1]
+            cube[i,j,:,1] = spectra[n][2]
+        cube.flush(); del cube
+        if not sameGrid: os.rename(tmpFile, self.cubeFile)
+        dumpPickle({'elev': elvAxis, 'pwv': pwvAxis, 'freq': freq}, self.axesFile)
+        dumpPickle(hashes, self.hashFile)
+
+    #Write a quantized copy of the store whose samples are within maxTb [K] and maxTran of the full-precision values.
+    #Band-averaged brightness temperature and transmission are then within the same bounds.
+    def compress(self, maxTb=1.e-2, maxTran=1.e-4):
+        full   = np.load(self.cubeFile, mmap_mode='r')
+        axes   = loadPickle(self.axesFile)
+        maxErr = np.array([maxTb, maxTran])
+        offset = np.nanmin(full, axis=2)
+        scale  = np.nanmax(full, axis=2) - offset
+        levels = np.nanmax(scale/(2.*maxErr))
+        if   levels <= np.iinfo(np.uint8).max:  dtype = np.uint8
+        elif levels <= np.iinfo(np.uint16).max: dtype = np.uint16
+        else: raise Exception('Cannot compress the ATM store to within %.1e K and %.1e transmission with 16 bits' % (maxTb, maxTran))
+        scale  = scale/np.iinfo(dtype).max; scale[scale == 0.] = 1.
+
+        #Quantize one elevation at a time, writing to a temporary file that is moved into place
+        tmpFile = self.cmpFile+'.%d.tmp' % (os.getpid())
+        cube    = np.lib.format.open_memmap(tmpFile, mode='w+', dtype=dtype, shape=np.shape(full))
+        err     = np.zeros(2)
+        for i in range(len(full)):
+            row     = np.array(full[i])
+            q       = np.round((row - offset[i][:,np.newaxis,:])/scale[i][:,np.newaxis,:])
+            cube[i] = np.nan_to_num(q).astype(dtype)
+            err     = np.fmax(err, np.nanmax(abs(cube[i]*scale[i][:,np.newaxis,:] + offset[i][:,np.newaxis,:] - row), axis=(0,1)))
+        cube.flush(); del cube
+        os.rename(tmpFile, self.cmpFile)
+        axes.update({'offset': offset, 'scale': scale, 'maxErr': err, 'hashes': self.__stored()[1]})
+        dumpPickle(axes, self.qntFile)
+        self.log.log('Wrote %d-bit ATM store %s: max error %.2e K in Tb and %.2e in transmission' % (8*np.dtype(dtype).itemsize, self.cmpFile, err[0], err[1]), 1)
+        return err
+
+    #***** Private methods *****
+    #Use the compressed store when it exists and is not older than the full-precision store
+    def __compressed(self):
+        if not (os.path.exists(self.cmpFile) and os.path.exists(self.qntFile)): return False
+        if not os.path.exists(self.cubeFile): return True
+        if loadPickle(self.qntFile)['hashes'] == self.__stored()[1]: return True
+        self.log.log('Compressed ATM store %s is out of date; using %s instead' % (self.cmpFile, self.cubeFile), 1)
+        return False
+
+    #Spectra of the grid cells (i, j) between stored frequency indices lo and hi, with shape (cells, freqs, 2)
+    def __read(self, i, j, lo, hi):
+        if self.quant is None: return self.cube[i, j, lo:hi]
+        return self.cube[i, j, lo:hi]*self.quant['scale'][i, j][:,np.newaxis,:] + self.quant['offset'][i, j][:,np.newaxis,:]
+
+    #Lower grid index and fractional distance to the next grid point for each value in x
+    def __weights(self, axis, x, name, unit):
+        x = np.atleast_1d(x).astype(np.float)
+        if np.any(x < axis[0]) or np.any(x > axis[-1]):
+            raise Exception('%s outside of the stored ATM range [%.1f, %.1f] %s' % (name, axis[0], axis[-1], unit))
+        ind = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis)-2)
+        return ind, (x - axis[ind])/(axis[ind+1] - axis[ind])
+
+    #Parse elevation [deg] and PWV [mm] from an 'atm_XXdeg_YYYYum.txt' file name
+    def __parseName(self, atmFile):
+        name = atmFile.split('/')[-1].split('_')
+        return float(name[1][:2]), float(name[2][:4])*1e-3
+
+    #Axes and per-file content hashes of the existing binary store
+    def __stored(self):
+        try:
+            axes   = loadPickle(self.axesFile)
+            hashes = loadPickle(self.hashFile)
+        except (IOError, EOFError, pk.UnpicklingError):
+            return None, {}
+        if not os.path.exists(self.cubeFile): return None, {}
+        return axes, hashes
+
+    #Grid indices of an ATM text file within the given axes
+    def __cell(self, atmFile, elvAxis, pwvAxis):
+        elv, pwv = self.__parseName(atmFile)
+        return np.searchsorted(elvAxis, round(elv, 0)), np.searchsorted(pwvAxis, round(pwv, 1))
+
+    #Whether the full-precision store and its axes have been written
+    def __complete(self):
+        return os.path.exists(self.cubeFile) and os.path.exists(self.axesFile)
+
+    #Open the binary store as a read-only memory map, shared between processes through the page cache
+    def __load(self, compressed):
+        if compressed:
+            axes       = loadPickle(self.qntFile)
+            self.quant = {'offset': axes['offset'], 'scale': axes['scale'], 'maxErr': axes['maxErr']}
+            self.path  = self.cmpFile
+            self.log.log('Using compressed ATM store %s: max error %.2e K in Tb and %.2e in transmission' % (self.cmpFile, axes['maxErr'][0], axes['maxErr'][1]), 2)
+        else:
+            axes       = loadPickle(self.axesFile)
+            self.quant = None
+            self.path  = self.cubeFile
+        self.elvArr  = axes['elev']
+        self.pwvArr  = axes['pwv']
+        self.freq    = axes['freq']
+        self.cube    = np.load(self.path, mmap_mode='r')
+        self.__elvInd = {int(round(self.elvArr[i], 0)): i for i in range(len(self.elvArr))}
+        self.__pwvInd = {round(self.pwvArr[i], 1):      i for i in range(len(self.pwvArr))}
+
+    #Do not pickle the memory map between processes; re-open it on the other side instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['cube']
+        return state
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cube = np.load(self.path, mmap_mode='r')
@@ -2,33 +2,61 @@
 import numpy as np
 import units as un
 
+#Parsed band files per path and bands resampled per frequency grid, shared read-only within each process
+fileTable = {}
+gridTable = {}
+maxTable  = 4096
+
+#Parse a band file into (frequency [Hz], efficiency, error) arrays, or None if the file type is not understood
+def loadBand(log, bandFile):
+    if bandFile not in fileTable:
+        ftype = bandFile.split('.')[-1]
+        if   'csv' in ftype: delim = ','
+        elif 'txt' in ftype: delim = None
+        else:
+            log.log('Unable to parse band file %s.' % (bandFile), 0)
+            fileTable[bandFile] = None
+            return None
+        data  = np.loadtxt(bandFile, unpack=True, dtype=np.float, delimiter=delim)
+        freqs = data[0]; eff = data[1]
+        if len(data) > 2: err = data[2]
+        else:             err = None
+        if not np.all(freqs > 1.e6): freqs = freqs*un.GHzToHz #Convert to Hz if band file is in GHz
+        band = [freqs, eff, err]
+        for arr in band:
+            if arr is not None: arr.flags.writeable = False
+        if len(fileTable) >= maxTable: fileTable.clear()
+        fileTable[bandFile] = tuple(band)
+    return fileTable[bandFile]
+
+#Resample a band file onto a frequency grid, with zero efficiency outside the measured range
+def resampleBand(log, bandFile, freqArr):
+    freqArr = np.asarray(freqArr, dtype=np.float)
+    key = (bandFile, freqArr.tostring())
+    if key not in gridTable:
+        band = loadBand(log, bandFile)
+        if band is None: return None
+        freqs, eff, err = band
+        mask = (freqArr >= freqs[0]) & (freqArr <= freqs[-1])
+        eff  = np.where(mask, np.interp(freqArr, freqs, eff), 0.)
+        if err is not None: err = np.where(mask, np.interp(freqArr, freqs, err), 0.)
+        band = [freqArr.copy(), eff, err]
+        for arr in band:
+            if arr is not None: arr.flags.writeable = False
+        if len(gridTable) >= maxTable: gridTable.clear()
+        gridTable[key] = tuple(band)
+    return gridTable[key]
+
 class Band:
     def __init__(self, log, bandFile, freqArr=None):
         self.log   = log
         self.ftype = bandFile.split('.')[-1]
 
-        #Parse band file
-        if 'csv' in self.ftype:
-            try:    freqs, self.eff, self.err = np.loadtxt(bandFile, unpack=True, dtype=np.float, delimiter=',')
-            except: freqs, self.eff,          = np.loadtxt(bandFile, unpack=True, dtype=np.float, delimiter=','); self.err = None
-            if not np.all(freqs) > 1.e6: self.freqs = freqs*un.GHzToHz #Convert to Hz if band file is in GHz
-            if freqArr is not None:
-                mask = np.array([1. if f >= self.freqs[0] and f <= self.freqs[-1] else 0. for f in freqArr])
-                self.eff   = np.interp(freqArr, self.freqs, self.eff)*mask
-                if self.err is not None: self.err   = np.interp(freqArr, self.freqs, self.err)*mask
-                self.freqs = freqArr
-        elif 'txt' in self.ftype:
-            try:    freqs, self.eff, self.err = np.loadtxt(bandFile, unpack=True, dtype=np.float)
-            except: freqs, self.eff,          = np.loadtxt(bandFile, unpack=True, dtype=np.float); self.err = None
-            if not np.all(freqs) > 1.e6: self.freqs = freqs*un.GHzToHz #Convert to Hz if band file is in GHz
-            if freqArr is not None:
-                mask = np.array([1. if f >= self.freqs[0] and f <= self.freqs[-1] else 0. for f in freqArr])
-                self.eff   = np.interp(freqArr, self.freqs, self.eff)*mask
-                if self.err is not None: self.err   = np.interp(freqArr, self.freqs, self.err)*mask
-                self.freqs = freqArr
-        else:
-            self.log.log('Unable to parse band file %s.' % (bandFile), 0)
-            self.freqs = None;  self.eff = None; self.err = None
+        #Parse band file, or fetch it already resampled onto this frequency grid
+        if freqArr is not None: band = resampleBand(log, bandFile, freqArr)
+        else:                   band = loadBand(log, bandFile)
+        if band is None: self.freqs = None;  self.eff = None; self.err = None
+        else:            self.freqs, self.eff, self.err = band
 
     #***** Public Methods *****
     #Sample the band
@@ -22,6 +22,10 @@ class Calculate:
     def calcOpticalPower(self, ch, tp):
         return self.sens.opticalPower(ch, tp)
 
+    #Calculate sensitivity and optical power for this channel in one pass
+    def calcLoading(self, ch, tp):
+        return self.sens.loading(ch, tp)
+
     #Combine the sensitivities of multiple channels
     def combineSensitivity(self, sensArr):
         self.snsmeans = [[[[sensArr[i][j][k][0][m] for m in range(len(sensArr[i][j][k][0]))] for k in range(len(sensArr[i][j]))] for j in range(len(sensArr[i]))] for i in range(len(sensArr))]
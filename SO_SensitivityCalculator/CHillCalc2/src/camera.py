@@ -6,10 +6,11 @@ import opticalChain as oc
 import channel      as ch
 
 class Camera:
-    def __init__(self, log, dir, sky, scn, nrealize=1, nobs=1, clcDet=1, specRes=1.e9):
+    def __init__(self, log, dir, sky, scn, wth=None, nrealize=1, nobs=1, clcDet=1, specRes=1.e9, dtype=np.float64):
         self.log = log
         self.sky = sky
         self.scn = scn
+        self.wth = wth
 
         self.dir        = dir
         self.configDir  = self.dir+'/config'
@@ -46,7 +47,7 @@ class Camera:
         self.detBandDict = bandDict(self.bandDir+'/Detectors')
         chans            = np.loadtxt(self.configDir+'/channels.txt', dtype=np.str, delimiter='|'); keyArr  = chans[0]; elemArr = chans[1:]
         self.chanDicts   = [{keyArr[i].strip(): elem[i].strip() for i in range(len(keyArr))} for elem in elemArr]
-        self.channels    = [ch.Channel(log, chDict, self, self.optChain, self.sky, self.scn, detBandDict=self.detBandDict, nrealize=nrealize, nobs=nobs, clcDet=clcDet, specRes=specRes) for chDict in self.chanDicts]
+        self.channels    = [ch.Channel(log, chDict, self, self.optChain, self.sky, self.scn, wth=self.wth, detBandDict=self.detBandDict, nrealize=nrealize, nobs=nobs, clcDet=clcDet, specRes=specRes, dtype=dtype) for chDict in self.chanDicts]
 
         #Store pixel dictionary
         self.pixels   = {}
@@ -6,16 +6,18 @@ import parameter      as pr
 import units          as un
 
 class Channel:
-    def __init__(self, log, channelDict, camera, optChain, sky, scn, detBandDict=None, nrealize=1, nobs=1, clcDet=1, specRes=1.e9):
+    def __init__(self, log, channelDict, camera, optChain, sky, scn, wth=None, detBandDict=None, nrealize=1, nobs=1, clcDet=1, specRes=1.e9, dtype=np.float64):
         self.log         = log
         self.dict        = channelDict
         self.camera      = camera
         self.optChain    = optChain
         self.sky         = sky
         self.scn         = scn
+        self.wth         = wth
         self.detBandDict = detBandDict
         self.nobs        = nobs
         self.specRes     = specRes
+        self.dtype       = dtype
         
         #Name this channel
         self.bandID    = int(self.dict['Band ID'])
@@ -60,17 +62,47 @@ class Channel:
         self.wf         = samp(pr.Parameter(self.dict['Waist Factor']),         pos=True, min=2.)
         self.apEff      = None #Calculated later
         self.edgeTaper  = None #Calculated later
+        self.corrFacts  = {}   #Bose correlation factors per element list, calculated later
 
         #Store the detector array object
         if self.detBandDict and self.name in self.detBandDict.keys(): self.detArray = da.DetectorArray(self.log, self, self.detBandDict[self.name])
         else:                                                         self.detArray = da.DetectorArray(self.log, self)
 
         #Store the observation set object
-        self.obsSet = os.ObservationSet(self.log, self.detArray, self.sky, self.scn, nobs=self.nobs)
+        self.obsSet = os.ObservationSet(self.log, self.detArray, self.sky, self.scn, nobs=self.nobs, wth=self.wth)
+        self.nobs   = len(self.obsSet.observations)
         
-        #Build the element, emissivity, efficiency, and temperature arrays
+        #Store the element names once per chain, and each element's emissivity, efficiency, and temperature compactly as (observation, detector, frequency),
+        #with a single entry along every axis the element does not vary over: the sky varies per observation, the detectors per detector, and flat spectra keep a single frequency bin
         optElem, optEmiss, optEffic, optTemp = self.optChain.generate(self)
-        self.elem  = np.array([[obs.elem[i]  + optElem  + self.detArray.detectors[i].elem   for i in range(self.detArray.nDet)] for obs in self.obsSet.observations]).astype(np.str)
-        self.emiss = np.array([[obs.emiss[i] + optEmiss + self.detArray.detectors[i].emiss  for i in range(self.detArray.nDet)] for obs in self.obsSet.observations]).astype(np.float)
-        self.effic = np.array([[obs.effic[i] + optEffic + self.detArray.detectors[i].effic  for i in range(self.detArray.nDet)] for obs in self.obsSet.observations]).astype(np.float)
-        self.temp  = np.array([[obs.temp[i]  + optTemp  + self.detArray.detectors[i].temp   for i in range(self.detArray.nDet)] for obs in self.obsSet.observations]).astype(np.float)
+        obsArr       = self.obsSet.observations
+        self.elem    = np.array(obsArr[0].elem + optElem + self.detArray.elem)
+        self.__nsky  = len(obsArr[0].elem)
+        self.__parts = {'emiss': self.__compact([obs.emiss for obs in obsArr], optEmiss, self.detArray.emiss),
+                        'effic': self.__compact([obs.effic for obs in obsArr], optEffic, self.detArray.effic),
+                        'temp':  self.__compact([obs.temp  for obs in obsArr], optTemp,  self.detArray.temp)}
+
+    #***** Public Methods *****
+    #Emissivity, efficiency, and temperature as lists of per-element arrays that broadcast against (observation, detector, frequency), for a slice of observations
+    def elements(self, obs=slice(None), dtype=None):
+        if dtype is None: dtype = self.dtype
+        return [[np.asarray(arr[obs] if k < self.__nsky else arr, dtype=dtype) for k, arr in enumerate(self.__parts[key])] for key in ['emiss', 'effic', 'temp']]
+
+    #Emissivity, efficiency, and temperature stacked into fresh (observation, detector, element, frequency) arrays, for a slice of observations
+    def tensors(self, obs=slice(None), dtype=None):
+        shape = (len(range(self.nobs)[obs]), self.detArray.nDet, len(self.elem), len(self.freqs))
+        ret   = []
+        for elemArr in self.elements(obs, dtype):
+            arr = np.empty(shape, dtype=elemArr[0].dtype)
+            for k in range(len(elemArr)):
+                arr[:,:,k] = elemArr[k]
+            ret.append(arr)
+        return ret
+
+    #***** Private Methods *****
+    #Sky (observation, element, frequency or 1), optics (element, frequency or scalar), and detector (detector, element, frequency or 1) parts as one (observation, detector, frequency) array per element
+    def __compact(self, skyArr, optArr, detArr):
+        sky = [np.asarray([spec[k] for spec in skyArr], dtype=self.dtype)[:,np.newaxis,:] for k in range(len(skyArr[0]))]
+        opt = [np.asarray(spec, dtype=self.dtype).reshape((1, 1, -1))                      for spec in optArr]
+        det = [np.asarray(detArr, dtype=self.dtype)[np.newaxis,:,k,:]                       for k in range(np.shape(detArr)[1])]
+        return sky + opt + det
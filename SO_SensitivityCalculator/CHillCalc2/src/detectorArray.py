@@ -1,20 +1,48 @@
 #python Version 2.7.2
-import detector  as dt
+import numpy     as np
+import parameter as pr
+import units     as un
+import physics   as ph
 import band      as bd
 
+#Detector population stored as columns, with one entry per computed detector
 class DetectorArray:
     def __init__(self, log, ch, bandFile=None):
         self.log  = log
         self.ch   = ch
         self.nDet = int(self.ch.clcDet) #Number of detectors to calculate
+        self.__ph = ph.Physics()
 
-        #Store detectors
-        if bandFile: 
-            band  = bd.Band(log, bandFile, ch.freqs)
-            if band.eff is not None:
-                bands = band.sample(nsample=self.nDet)
-                self.detectors  = [dt.Detector(log, self.ch, bands[i]) for i in range(self.nDet)]
-            else:
-                self.detectors  = [dt.Detector(log, self.ch)           for i in range(self.nDet)]
-        else:
-            self.detectors  = [dt.Detector(log, self.ch)           for i in range(self.nDet)]
+        #Sample detector parameters for every detector in one draw per parameter
+        def samp(param, bandID=ch.bandID, pos=False, norm=False, min=None, max=None):
+            if ch.clcDet == 1: return np.ones(self.nDet)*param.getAvg(bandID)
+            else:              return np.ones(self.nDet)*param.sample(bandID=bandID, nsample=self.nDet, pos=pos, norm=norm, min=min, max=max)
+        self.bandCenter    = samp(pr.Parameter(ch.dict['Band Center'], un.GHzToHz),     pos=True)
+        self.fbw           = samp(pr.Parameter(ch.dict['Fractional BW']),               pos=True, norm=True)
+        self.flo, self.fhi = self.__ph.bandEdges(self.bandCenter, self.fbw)
+        self.detEff        = samp(pr.Parameter(ch.dict['Det Eff']),                     pos=True, norm=True)*ch.optCouple
+        self.psat          = samp(pr.Parameter(ch.dict['Psat'], un.pWtoW),              pos=True)
+        self.psatFact      = samp(pr.Parameter(ch.dict['Psat Factor']),                 pos=True)
+        self.n             = samp(pr.Parameter(ch.dict['Carrier Index']),               pos=True)
+        self.Tb            = ch.Tb
+        self.Tc            = samp(pr.Parameter(ch.dict['Tc']),                          min=self.Tb+0.001)
+        self.TcFrac        = samp(pr.Parameter(ch.dict['Tc Fraction']),                 min=1.01)
+        self.Tc            = np.where(np.isnan(self.Tc), self.Tb*self.TcFrac, self.Tc)
+        self.nei           = samp(pr.Parameter(ch.dict['SQUID NEI'], un.pArtHzToArtHz), pos=True)
+        self.boloR         = samp(pr.Parameter(ch.dict['Bolo Resistance']),             pos=True)
+        self.readN         = samp(pr.Parameter(ch.dict['Read Noise Frac']),             pos=True)
+
+        #Load bands
+        eff = None
+        if bandFile:
+            band = bd.Band(log, bandFile, ch.freqs)
+            if band.eff is not None: eff = np.clip(band.sample(nsample=self.nDet), 0., 1.)
+        if eff is None:
+            #Default to top hat bands
+            eff = np.where((ch.freqs > self.flo[:,np.newaxis]) & (ch.freqs < self.fhi[:,np.newaxis]), self.detEff[:,np.newaxis], 0.)
+
+        #Store detector optical parameters, as (detector, element, frequency), with the flat emissivity and bath temperature kept as a single frequency bin
+        self.elem  = ["Detector"]
+        self.emiss = np.zeros((self.nDet, 1, 1))
+        self.effic = eff[:,np.newaxis,:]
+        self.temp  = np.full((self.nDet, 1, 1), self.Tb)
@@ -310,8 +310,8 @@ class Display:
                     fi.write(row)
                     fi.write(units)
                     fi.write(row)
-                    for m in range(len(ch.elem[0][0])):
-                        elemName = ch.elem[0][0][m]
+                    for m in range(len(ch.elem)):
+                        elemName = ch.elem[m]
                         values = ("| %-15s | %-5.2f +/- %-5.2f | %-5.2f +/- %-5.2f | %-5.3f +/- %-5.3f |\n" 
                                   % (elemName, 
                                      self.optmeans[i][j][k][0][m]*un.WtoPw, self.optstds[i][j][k][0][m]*un.WtoPw, 
@@ -4,7 +4,7 @@ import glob      as gb
 import telescope as tp
 
 class Experiment:
-    def __init__(self, log, dir, nrealize=1, nobs=1, clcDet=1, elv=None, pwv=None, specRes=1.e9, foregrounds=False):
+    def __init__(self, log, dir, nrealize=1, nobs=1, clcDet=1, elv=None, pwv=None, specRes=1.e9, foregrounds=False, quad=None, dtype=np.float64):
         self.log       = log        
         self.dir       = dir
         self.configDir = self.dir+'/config'
@@ -21,4 +21,4 @@ class Experiment:
         
         #Store telescope objects
         telescopeDirs   = sorted(gb.glob(dir+'/*/')); telescopeDirs = [x for x in telescopeDirs if 'config' not in x]
-        self.telescopes = [tp.Telescope(self.log, dir, fgndDict=fgndDict, nrealize=nrealize, nobs=nobs, clcDet=clcDet, elv=elv, pwv=pwv, specRes=specRes, foregrounds=foregrounds) for dir in telescopeDirs]
+        self.telescopes = [tp.Telescope(self.log, dir, fgndDict=fgndDict, nrealize=nrealize, nobs=nobs, clcDet=clcDet, elv=elv, pwv=pwv, specRes=specRes, foregrounds=foregrounds, quad=quad, dtype=dtype) for dir in telescopeDirs]
@@ -0,0 +1,80 @@
+#python Version 2.7.2
+import numpy as np
+
+#Numba is optional; without it every kernel falls back to the NumPy code in physics.py, noise.py, and sensitivity.py
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+#Active kernel backend, 'numpy' or 'numba'
+backend = 'numpy'
+
+#Select the kernel backend, falling back to NumPy if numba cannot be imported
+def setBackend(name, log=None):
+    global backend
+    name = str(name).strip().lower()
+    if name not in ['numpy', 'numba']:
+        raise Exception("Unknown kernel backend '%s' -- use 'NumPy' or 'Numba'" % (name))
+    if name == 'numba' and nb is None:
+        if log is not None: log.log("Numba kernels requested but numba is not installed; using NumPy kernels", 1)
+        name = 'numpy'
+    backend = name
+    if log is not None: log.log("Using %s physics and noise kernels" % ({'numpy': 'NumPy', 'numba': 'Numba'}[backend]), 2)
+    return backend
+
+#Whether the compiled kernels are active
+def compiled():
+    return backend == 'numba'
+
+#Trapezoidal integral over the last axis
+def trapz(y, x):
+    if not compiled(): return np.trapz(y, x)
+    y = np.ascontiguousarray(y, dtype=np.float64); x = np.ascontiguousarray(x, dtype=np.float64)
+    return trapzKernel(y.reshape(-1, y.shape[-1]), x).reshape(y.shape[:-1])
+
+#Photon NEP sqrt(int 2 h nu P + 2 P2 dnu) over the last axis, without building the integrand
+def photonNEP(popt, popt2, freqs, h):
+    if not compiled(): return np.sqrt(np.trapz((2*h*freqs*popt + 2*popt2), freqs))
+    popt, popt2 = np.broadcast_arrays(np.asarray(popt, dtype=np.float64), np.asarray(popt2, dtype=np.float64))
+    shape = popt.shape[:-1]
+    popt  = np.ascontiguousarray(popt).reshape(-1, popt.shape[-1]); popt2 = np.ascontiguousarray(popt2).reshape(-1, popt2.shape[-1])
+    return photonNEPKernel(popt, popt2, np.ascontiguousarray(freqs, dtype=np.float64), h).reshape(shape)
+
+#***** Compiled kernels *****
+if nb is not None:
+    #Blackbody power spectrum on a diffraction-limited polarimeter [W/Hz], fused into one broadcasting ufunc
+    @nb.vectorize(['float64(float64, float64, float64, float64, float64, float64)'], nopython=True, cache=True)
+    def bbPowSpec(freq, temp, emiss, h, kB, c):
+        return 0.5*(c/freq)**2*emiss*(2*h*freq**3/c**2)/(np.exp((h*freq)/(kB*temp)) - 1.)
+
+    #Blackbody dP/dT spectrum on a diffraction-limited polarimeter [W/K/Hz], fused into one broadcasting ufunc
+    @nb.vectorize(['float64(float64, float64, float64, float64, float64)'], nopython=True, cache=True)
+    def aniPowSpec(freq, temp, emiss, h, kB):
+        x = (h*freq)/(kB*temp)
+        n = 1./(np.exp(x) - 1.)
+        return ((h**2)/kB)*emiss*n**2*((freq**2)/(temp**2))*np.exp(x)
+
+    #Bolometer NEP [W/rtHz], fused into one broadcasting ufunc
+    @nb.vectorize(['float64(float64, float64, float64, float64, float64)'], nopython=True, cache=True)
+    def bolometerNEP(psat, n, Tc, Tb, kB):
+        return np.sqrt(4*kB*psat*Tb*(((n+1)**2/((2*n)+3))*(((Tc/Tb)**((2*n)+3) - 1)/((Tc/Tb)**(n+1) - 1)**2)))
+
+    @nb.njit(cache=True)
+    def trapzKernel(y, x):
+        out = np.zeros(y.shape[0])
+        for i in range(y.shape[0]):
+            for k in range(len(x)-1):
+                out[i] += 0.5*(x[k+1] - x[k])*(y[i,k+1] + y[i,k])
+        return out
+
+    @nb.njit(cache=True)
+    def photonNEPKernel(popt, popt2, freqs, h):
+        out = np.zeros(popt.shape[0])
+        for i in range(popt.shape[0]):
+            for k in range(len(freqs)-1):
+                lo = 2*h*freqs[k  ]*popt[i,k  ] + 2*popt2[i,k  ]
+                hi = 2*h*freqs[k+1]*popt[i,k+1] + 2*popt2[i,k+1]
+                out[i] += 0.5*(freqs[k+1] - freqs[k])*(lo + hi)
+            out[i] = np.sqrt(out[i])
+        return out
@@ -2,6 +2,41 @@
 import numpy   as np
 import pickle  as pk
 import physics as ph
+import kernels as kr
+
+#Correlation tables, loaded once per process and shared read-only by every Noise instance
+corrDir = '/'.join(__file__.split('/')[:-1])+'/detCorrFiles/PKL/'
+def loadCorr(name):
+    pitch, corr = pk.load(open(corrDir+name+'.pkl', 'rb'))
+    pitch = np.array(pitch, dtype=np.float); pitch.flags.writeable = False
+    corr  = np.array(corr);                  corr.flags.writeable  = False
+    return pitch, corr
+p_c_apert, c_apert = loadCorr('coherentApertCorr')
+p_c_stop,  c_stop  = loadCorr('coherentStopCorr')
+p_i_apert, i_apert = loadCorr('incoherentApertCorr')
+p_i_stop,  i_stop  = loadCorr('incoherentStopCorr')
+
+#Geometric pitch factor
+corrFact = 6 #Hex packing
+
+#Factor tables already built for single pitches and element codes already built for element lists
+pitchTable = {}
+codeTable  = {}
+maxTable   = 4096
+
+#Coherent aperture, incoherent aperture, and incoherent stop factors for one or many detector pitches [F-lambda]
+def pitchFactors(detPitchFlamb, FlambMax=3.):
+    pitch = np.atleast_1d(np.array(detPitchFlamb, dtype=np.float))
+    ndets = np.array([int(round(FlambMax/float(p), 0)) for p in pitch])
+    #Nearest tabulated pitch to each neighbour along the hex axes, with neighbours beyond ndets pointing at a zero entry
+    n     = np.arange(1, max(np.max(ndets), 1)+1)
+    targ  = np.concatenate([pitch[:,np.newaxis]*n, pitch[:,np.newaxis]*n*np.sqrt(3.)], axis=1)
+    inds  = np.argmin(abs(p_c_apert[np.newaxis,np.newaxis,:] - targ[:,:,np.newaxis]), axis=2)
+    inds  = np.where(np.tile(n, 2)[np.newaxis,:] <= ndets[:,np.newaxis], inds, len(p_c_apert))
+    inds  = np.sort(inds, axis=1)
+    apert = np.sum(np.append(abs(c_apert), 0.)[inds], axis=1)
+    stop  = np.sum(np.append(abs(c_stop),  0.)[inds], axis=1)
+    return np.sqrt(apert*corrFact + 1.), np.sqrt(apert*corrFact + 1.), np.sqrt(stop*corrFact + 1.)
 
 class Noise:
     def __init__(self):     
@@ -10,60 +45,46 @@ class Noise:
         #Efficiency of the galaxy
         self.__skyEff = 1.0
 
-        #Correlation files
-        dir = '/'.join(__file__.split('/')[:-1])+'/detCorrFiles/PKL/'
-        self.p_c_apert, self.c_apert = pk.load(open(dir+'coherentApertCorr.pkl',   'rb'))
-        self.p_c_stop,  self.c_stop  = pk.load(open(dir+'coherentStopCorr.pkl',    'rb'))
-        self.p_i_apert, self.i_apert = pk.load(open(dir+'incoherentApertCorr.pkl', 'rb'))
-        self.p_i_stop,  self.i_stop  = pk.load(open(dir+'incoherentStopCorr.pkl',  'rb'))
+        #Correlation tables shared by the module
+        self.p_c_apert, self.c_apert = p_c_apert, c_apert
+        self.p_c_stop,  self.c_stop  = p_c_stop,  c_stop
+        self.p_i_apert, self.i_apert = p_i_apert, i_apert
+        self.p_i_stop,  self.i_stop  = p_i_stop,  i_stop
         #Detector pitch array
         self.DetP = self.p_c_apert
         #Geometric pitch factor
-        self.corrFact = 6 #Hex packing
+        self.corrFact = corrFact
         
-    #Bose correlation factors
+    #Bose correlation factors, as (element) for one pitch or (pitch, element) for an array of pitches
     def corrFactors(self, elemArr, detPitchFlamb, FlambMax=3.):
         FlambMax = 3. #Consider correlations out to this length
-        ndets = int(round(FlambMax/float(detPitchFlamb), 0))
-        inds1 = [np.argmin(abs(np.array(self.DetP) - detPitchFlamb*(n+1)            )) for n in range(ndets)]
-        inds2 = [np.argmin(abs(np.array(self.DetP) - detPitchFlamb*(n+1)*np.sqrt(3.))) for n in range(ndets)]
-        inds  = np.sort(inds1 + inds2)
-        c_apert = np.sum([abs(self.c_apert)[ind] for ind in inds])
-        i_apert = np.sum([abs(self.c_apert)[ind] for ind in inds])
-        i_stop  = np.sum([abs(self.c_stop)[ ind] for ind in inds])
-        c_apert  = np.sqrt(c_apert*self.corrFact + 1.)
-        i_apert  = np.sqrt(i_apert*self.corrFact + 1.)
-        i_stop   = np.sqrt(i_stop*self.corrFact  + 1.)
-        atDet = False
-        factors = []
-        for i in range(len(elemArr)):
-            if 'CMB' in elemArr[i]:
-                factors.append(c_apert)
-            if ('Apert' in elemArr[i]) or ('Lyot' in elemArr[i]) or ('Stop' in elemArr[i]):
-                factors.append(i_stop)
-                atDet = True
-            elif not atDet:
-                factors.append(i_apert)
-            else:
-                factors.append(1.)
-        return np.array(factors[:-1])
+        if np.ndim(detPitchFlamb) == 0:
+            key = float(detPitchFlamb)
+            if key not in pitchTable:
+                if len(pitchTable) >= maxTable: pitchTable.clear()
+                pitchTable[key] = self.__table(key, FlambMax)[0]
+            table = pitchTable[key]
+        else:
+            table = self.__table(detPitchFlamb, FlambMax)
+        return table[...,self.__codes(elemArr)]
 
     #Photon noise equivalent power on a diffraction-limited detector [W/rtHz]
-    def photonNEP(self, poptArr, freqs, elemArr=None, detPitchFlamb=None):
-        popt  = sum([x for x in poptArr])
+    #poptArr is (element, frequency), or stacked as (..., element, frequency) for many detectors at once
+    #Correlation factors are either computed from elemArr and detPitchFlamb or passed in as (..., element)
+    def photonNEP(self, poptArr, freqs, elemArr=None, detPitchFlamb=None, factors=None):
+        poptArr = np.asarray(poptArr)
+        #The pairwise sums over elements are squares of the (weighted) sum over elements
+        popt    = np.sum(poptArr, axis=-2)
+        nep     = kr.photonNEP(popt, popt**2, freqs, self.__ph.h)
         #Don't consider correlations
-        if elemArr is None and detPitchFlamb is None:
-            popt2  = sum([x*y for x in poptArr for y in poptArr])
-            nep    = np.sqrt(np.trapz((2*self.__ph.h*freqs*popt + 2*popt2), freqs))
+        if elemArr is None and detPitchFlamb is None and factors is None:
             neparr = nep
             return nep, neparr
         #Consider correlations
         else:
-            factors = self.corrFactors(elemArr, detPitchFlamb)
-            popt2    = sum([poptArr[i]*poptArr[j]                       for i in range(len(poptArr)) for j in range(len(poptArr))])
-            popt2arr = sum([factors[i]*factors[j]*poptArr[i]*poptArr[j] for i in range(len(poptArr)) for j in range(len(poptArr))])
-            nep    = np.sqrt(np.trapz((2*self.__ph.h*freqs*popt + 2*popt2),    freqs))
-            neparr = np.sqrt(np.trapz((2*self.__ph.h*freqs*popt + 2*popt2arr), freqs))
+            if factors is None: factors = self.corrFactors(elemArr, detPitchFlamb)
+            popt2arr = np.sum(np.asarray(factors)[...,np.newaxis]*poptArr, axis=-2)**2
+            neparr   = kr.photonNEP(popt, popt2arr, freqs, self.__ph.h)
             return nep, neparr
 
     #RJ approximation of photon noise equivalent power on a diffraction-limited detector [W/rt(Hz)]
@@ -73,6 +94,7 @@ class Noise:
 
     #Bolometer noise equivalent power [W/rt(Hz)]
     def bolometerNEP(self, psat, n, Tc, Tb):
+        if kr.compiled(): return kr.bolometerNEP(psat, n, Tc, Tb, self.__ph.kB)
         return np.sqrt(4*self.__ph.kB*psat*Tb*(((np.power((n+1),2.)/((2*n)+3))*((np.power((Tc/Tb),((2*n)+3)) - 1)/np.power((np.power((Tc/Tb),(n+1)) - 1),2.)))))
 
     #Readout noise equivalent power [W/rt(Hz)]
@@ -81,8 +103,7 @@ class Noise:
 
     #Change in power with change in CMB temperature [W/K]
     def dPdT(self, eff, freqs):
-        temp = np.array([self.__ph.Tcmb for f in freqs])
-        return np.trapz(self.__ph.aniPowSpec(np.array(freqs), temp, np.array(eff)), freqs)
+        return kr.trapz(self.__ph.aniPowSpec(np.array(freqs), self.__ph.Tcmb, np.array(eff)), freqs)
     
     #Photon noise equivalent temperature [K-rts]
     def photonNET(self, poptArr, freqs, skyEff, elemArr=None, detPitchFlamb=None):
@@ -124,3 +145,29 @@ class Noise:
     #Mapping speed [(K^2*s)^-1]
     def mappingSpeed(self, net, nDet, detYield=1.0):
         return detYield/np.power(self.NETarr(net, nDet), 2.)
+
+    #***** Private Methods *****
+    #Factors for each pitch, ordered by element code
+    def __table(self, detPitchFlamb, FlambMax):
+        c_apert, i_apert, i_stop = pitchFactors(detPitchFlamb, FlambMax)
+        return np.transpose([c_apert, i_stop, i_apert, np.ones(len(c_apert))])
+
+    #Which factor applies to each element: 0 coherent aperture, 1 incoherent stop, 2 incoherent aperture, 3 none
+    def __codes(self, elemArr):
+        key = tuple(elemArr)
+        if key not in codeTable:
+            atDet = False
+            codes = []
+            for i in range(len(elemArr)):
+                if 'CMB' in elemArr[i]:
+                    codes.append(0)
+                if ('Apert' in elemArr[i]) or ('Lyot' in elemArr[i]) or ('Stop' in elemArr[i]):
+                    codes.append(1)
+                    atDet = True
+                elif not atDet:
+                    codes.append(2)
+                else:
+                    codes.append(3)
+            if len(codeTable) >= maxTable: codeTable.clear()
+            codeTable[key] = np.array(codes[:-1])
+        return codeTable[key]
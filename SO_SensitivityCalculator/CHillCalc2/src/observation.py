@@ -2,17 +2,24 @@
 import numpy as np
 
 class Observation:
-    def __init__(self, log, detArray, sky, scn):
+    def __init__(self, log, detArray, sky, scn, pwv=None, elv=None):
         self.sky = sky
         self.scn = scn
 
-        #Sample PWV and Elevation
-        self.pwv = self.sky.pwvSample()
-        self.elv = self.scn.elvSample()
+        #Sample PWV and Elevation, unless they were drawn for the whole observation set
+        if pwv is None: self.pwv = self.sky.pwvSample()
+        else:           self.pwv = pwv
+        if elv is None: self.elv = self.scn.elvSample()
+        else:           self.elv = elv
                     
-        #Sample and store sky optical parameters
-        elem, emiss, effic, temp = np.hsplit(np.array([self.sky.generate(self.pwv, self.elv, det.ch.freqs) for det in detArray.detectors]), 4)
-        self.elem  = elem.reshape( len(elem),  len(elem[0][0]),  len(elem[0][0][0])).astype(np.str  );  self.elem  = np.array(self.elem,  order='F'); self.elem.resize(len(self.elem), len(self.elem[0])); self.elem  = self.elem.tolist()
-        self.emiss = emiss.reshape(len(emiss), len(emiss[0][0]), len(emiss[0][0][0])).astype(np.float);                                                                                                    self.emiss = self.emiss.tolist()
-        self.effic = effic.reshape(len(effic), len(effic[0][0]), len(effic[0][0][0])).astype(np.float);                                                                                                    self.effic = self.effic.tolist()
-        self.temp  = temp.reshape( len(temp),  len(temp[0][0]),  len(temp[0][0][0])).astype(np.float);                                                                                                     self.temp  = self.temp.tolist()
+        #Sample the sky optical parameters once, since every detector in the channel shares the frequencies and the weather, and store the element names
+        elem, emiss, effic, temp = self.sky.generate(self.pwv, self.elv, detArray.ch.freqs)
+        self.elem  = list(elem)
+        self.emiss = self.__spectra(emiss)
+        self.effic = self.__spectra(effic)
+        self.temp  = self.__spectra(temp)
+
+    #***** Private Methods *****
+    #Per-element spectra, keeping elements that are flat across the band as a single frequency bin
+    def __spectra(self, specArr):
+        return [np.atleast_1d(np.asarray(spec, dtype=np.float)) for spec in specArr]
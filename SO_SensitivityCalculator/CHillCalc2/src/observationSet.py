@@ -2,18 +2,27 @@
 import numpy        as np
 import observation  as ob
 import scanStrategy as sc
+import weather      as wt
 import units        as un
 
 class ObservationSet:
-    def __init__(self, log, detArray, sky, scn, nobs=1):
+    def __init__(self, log, detArray, sky, scn, nobs=1, wth=None):
         self.log      = log
         self.detArray = detArray
         self.sky      = sky
         self.scn      = scn
+        if wth is None: self.wth = wt.Weather(self.log, self.sky, self.scn)
+        else:           self.wth = wth
 
-        #Store observation objects
-        self.observations = [ob.Observation(self.log, self.detArray, self.sky, self.scn) for n in range(nobs)]
+        #Draw the weather for every observation at once, or take the weighted quadrature states, and store observation objects
+        if self.wth.quad is None:
+            pwvs, elvs   = self.wth.sample(nobs)
+            self.weights = np.ones(nobs)/float(nobs)
+        else:
+            pwvs, elvs, self.weights = self.wth.quadrature()
+            nobs = len(self.weights)
+        self.observations = [ob.Observation(self.log, self.detArray, self.sky, self.scn, pwv=pwvs[n], elv=elvs[n]) for n in range(nobs)]
         
-        #Store sky temperatures and efficiencies
-        self.temps  = np.array([obs.temp  for obs in self.observations])
-        self.effics = np.array([obs.effic for obs in self.observations])
+        #Store sky temperatures and efficiencies as (observation, element, frequency), since they are shared by every detector
+        self.temps  = np.array([[np.broadcast_to(spec, np.shape(detArray.ch.freqs)) for spec in obs.temp]  for obs in self.observations])
+        self.effics = np.array([[np.broadcast_to(spec, np.shape(detArray.ch.freqs)) for spec in obs.effic] for obs in self.observations])
@@ -28,8 +28,9 @@ class Optic:
         self.scattTemp    = pr.Parameter(dict['Scatter Temp'])    
 
     #***** Private Functions *****
-    #Ratio of blackbody power between two temperatures
+    #Ratio of blackbody power between two temperatures, which is exactly one when they are the same
     def __powFrac(self, T1, T2, freqs):
+        if np.array_equal(T1, T2): return 1.
         return np.trapz(self.__ph.bbPowSpec(freqs, T1), freqs)/np.trapz(self.__ph.bbPowSpec(freqs, T2), freqs)
 
     #Power spilled over the primrary mirror
@@ -50,58 +51,51 @@ class Optic:
         return y
 
     #***** Public Functions *****
-    #Generate element, temperature, emissivity, and efficiency
+    #Generate element, temperature, emissivity, and efficiency, keeping quantities that are flat across the band as scalars
     def generate(self, ch):
         def samp(param, bandID=ch.bandID, pos=True, norm=False): 
             if self.nrealize == 1: return param.getAvg(bandID)
             else:                  return param.sample(bandID=bandID, nsample=1, pos=pos, norm=norm)
 
         #Temperature
-        temp = samp(self.temper); temp  = [temp for f in ch.freqs]
+        temp = samp(self.temper)
 
-        #Efficiency from a band file?
+        #Efficiency from a band file? Parsed and resampled bands are cached per file and frequency grid
         if self.bandFile is not None:
             band = bd.Band(self.log, self.bandFile, ch.freqs)
             eff  = band.sample()[0]
-            if eff is not None:
-                eff = np.array([e if e > 0 else 0. for e in eff])
-                eff = np.array([e if e < 1 else 1. for e in eff])
-                #for e in eff:
-                #    if e > 1: e = 1.
-                #    if e < 0: e = 0.
+            if eff is not None: eff = np.clip(eff, 0., 1.)
         else: 
             eff = None
 
         #Reflection
         if eff is None:
-            if not self.refl.isEmpty():                                 refl = samp(self.refl, norm=True); refl = np.array([refl for f in ch.freqs])
+            if not self.refl.isEmpty():                                 refl = samp(self.refl, norm=True)
             elif 'Mirror' in self.element or 'Primary' in self.element: refl = 1. - self.__ph.ruzeEff(ch.freqs, samp(self.surfaceRough))
-            else:                                                       refl = 0.; refl = np.array([refl for f in ch.freqs])
+            else:                                                       refl = 0.
 
         #Spillover
         if not self.spill.isEmpty():     spill     = samp(self.spill, norm=True);
         elif 'Primary' in self.element:  spill     = self.__primarySpill(ch)
         else:                            spill     = 0.
-        spill = np.array([spill for f in ch.freqs])
-        if not self.spillTemp.isEmpty(): spillTemp = samp(self.spillTemp); spillTemp = np.array([spillTemp for f in ch.freqs])
-        else:                            spillTemp = np.array([temp for f in ch.freqs])
+        if not self.spillTemp.isEmpty(): spillTemp = samp(self.spillTemp)
+        else:                            spillTemp = temp
 
         #Scattering
         if not self.scattFrac.isEmpty(): scatt     = samp(self.scattFrac, norm=True)
         else:                            scatt     = 0.
-        scatt = np.array([scatt for f in ch.freqs])
-        if not self.scattTemp.isEmpty(): scattTemp = samp(self.scattTemp); scattTemp = np.array([scattTemp for f in ch.freqs])
-        else:                            scattTemp = np.array([temp for f in ch.freqs])
+        if not self.scattTemp.isEmpty(): scattTemp = samp(self.scattTemp)
+        else:                            scattTemp = temp
 
         #Absorption
         if 'Aperture' in self.element:
-            if not eff: 
-                if not self.absorb.isEmpty(): abso = samp(self.absorb, norm=True); abso = np.array([abso for f in ch.freqs])
+            if eff is None: 
+                if not self.absorb.isEmpty(): abso = samp(self.absorb, norm=True)
                 else:                         abso = 1. - self.__ph.spillEff(ch.freqs, ch.pixSize, ch.Fnumber, ch.wf)
             else:       
                 abso = 1. - eff
         else:
-            if not self.absorb.isEmpty():                               abso = samp(self.absorb, norm=True); abso = np.array([abso for f in ch.freqs])
+            if not self.absorb.isEmpty():                               abso = samp(self.absorb, norm=True)
             elif 'Mirror' in self.element or 'Primary' in self.element: abso = 1. - self.__ph.ohmicEff(ch.freqs, samp(self.conductivity))
             else:                                                       abso = self.__ph.dielectricLoss(ch.freqs, samp(self.thick), samp(self.index), samp(self.lossTan))
         
@@ -123,7 +117,8 @@ class Optic:
 
         #Store channel pixel parameters
         if elem == 'Aperture':
-            ch.apEff     = np.trapz(effic, ch.freqs)/(ch.freqs[-1] - ch.freqs[0])
+            if np.ndim(effic): ch.apEff = np.trapz(effic, ch.freqs)/(ch.freqs[-1] - ch.freqs[0])
+            else:              ch.apEff = effic
             ch.edgeTaper = self.__ph.edgeTaper(ch.apEff)
 
         return [elem, emiss, effic, temp]
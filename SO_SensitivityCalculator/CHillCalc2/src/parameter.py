@@ -17,9 +17,9 @@ class Parameter:
             self.std = self.__zero(self.avg)
 
     #***** Public Methods *****
+    #Missing values ('NA' in the input files) are stored as NaN
     def isEmpty(self):
-        if 'NA' in str(self.avg): return True
-        else:                     return False
+        return bool(np.all(np.isnan(self.avg)))
 
     def convolve(self, param):
         if not self.isEmpty() and not param.isEmpty():
@@ -33,7 +33,7 @@ class Parameter:
     
     def fetch(self, bandID=1):
         if self.isEmpty():
-            return ('NA', 'NA')
+            return (np.nan, np.nan)
         else:
             if 'array' in str(type(self.avg)): return (self.avg[bandID-1], self.std[bandID-1])
             else:                              return (self.avg,           self.std          )
@@ -46,31 +46,20 @@ class Parameter:
 
     def sample(self, bandID=1, nsample=1, pos=False, norm=False, min=None, max=None):
         if self.isEmpty(): 
-            return 'NA'
+            return np.nan
         else:
             avg, std = self.fetch(bandID)
             if std <= 0.: return avg
-            else:         
-                if nsample == 1: samp = np.random.normal(avg, std, nsample)[0]
-                else:            samp = np.random.normal(avg, std, nsample)
-                
-            if min is not None: 
-                if samp < min: return min
-            if max is not None:
-                if samp > max: return max
+            samp = np.random.normal(avg, std, nsample)
 
-            if   pos and norm:
-                if   samp < 0: return 0.
-                elif samp > 1: return 1.
-                else:          return samp
-            elif pos:
-                if samp < 0:   return 0.
-                else:          return samp
-            elif norm:
-                if samp > 1:   return 1.
-                else:          return samp
-            else:
-                return samp
+            #Clip to [0, 1] as requested, with explicit min and max bounds taking precedence
+            clip = samp
+            if pos:             clip = np.where(samp < 0,   0.,  clip)
+            if norm:            clip = np.where(samp > 1,   1.,  clip)
+            if max is not None: clip = np.where(samp > max, max, clip)
+            if min is not None: clip = np.where(samp < min, min, clip)
+            if nsample == 1: return clip[0]
+            else:            return clip
 
     #***** Private Methods *****
     def __float(self, val, unit=1.0):
@@ -80,7 +69,7 @@ class Parameter:
             try:
                 return unit*np.array(eval(val)).astype(np.float)
             except:
-                return str(val)
+                return np.nan
 
     def __zero(self, val):
         try:
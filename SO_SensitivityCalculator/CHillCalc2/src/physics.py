@@ -1,6 +1,13 @@
 #python Version 2.7.2
-import numpy as np
-import units as un
+import numpy       as np
+import collections as cl
+import kernels     as kr
+import units       as un
+
+#Emissivity-free Planck and dP/dT spectra shared by every Physics instance, keyed on frequency grid and temperature
+specCache = cl.OrderedDict()
+specStats = {'hits': 0, 'misses': 0}
+maxSpecs  = 2048
 
 #Class for handling general physics constants and equations
 class Physics:
@@ -145,7 +152,11 @@ class Physics:
         np.seterr(divide='ignore')
         np.seterr(over='ignore')
         freq, temp = self.__checkInputs(freq, [temp])
-        return 1./(np.exp((self.h*freq)/(self.kB*temp)) - 1.)
+        x = np.divide(self.h*freq, self.kB*temp)
+        if np.ndim(x) == 0: return 1./(np.exp(x) - 1.)
+        np.exp(x, out=x)
+        np.subtract(x, 1., out=x)
+        return np.divide(1., x, out=x)
 
     #Throughput for a diffraction-limited detector [m^2]
     def AOmega(self, freq):
@@ -155,12 +166,14 @@ class Physics:
     #Blackbody spectral radiance [W/(m^2-Hz)]
     def bbSpecRad(self, freq, temp, emissivity=1.0):
         freq, temp, emissivity = self.__checkInputs(freq, [temp, emissivity])
-        return emissivity*(2*self.h*(freq**3)/(self.c**2))*self.nOcc(freq, temp)
+        return self.__mul(emissivity*(2*self.h*(freq**3)/(self.c**2)), self.nOcc(freq, temp))
     
     #Power spectrum of a blackbody on a diffraction-limited polarimeter [W/Hz]
     def bbPowSpec(self, freq, temp, emissivity=1.0):
         freq, temp, emissivity = self.__checkInputs(freq, [temp, emissivity])
-        return 0.5*self.AOmega(freq)*self.bbSpecRad(freq, temp, emissivity)
+        T = self.__uniform(freq, temp)
+        if T is not None: return emissivity*self.__spectrum('bbPowSpec', freq, T)
+        return self.__bbPowKernel(freq, temp, emissivity)
 
     #Blackbody power  on a diffraction-limited polarimeter [J]
     def bbPower(self, freq, temp, emissivity=1.0):
@@ -180,41 +193,84 @@ class Physics:
     #Derivative of power spectrum with respect to temperature dP/dT on a diffraction-limited detector [W/K]
     def aniPowSpec(self, freq, temp, emissivity=1.0):
         freq, temp, emissivity = self.__checkInputs(freq, [temp, emissivity])
-        return ((self.h**2)/self.kB)*emissivity*(self.nOcc(freq, temp)**2)*((freq**2)/(temp**2))*np.exp((self.h*freq)/(self.kB*temp))
+        T = self.__uniform(freq, temp)
+        if T is not None: return emissivity*self.__spectrum('aniPowSpec', freq, T)
+        return self.__aniPowKernel(freq, temp, emissivity)
 
     #Derivative of power with respect to temperature dP/dT on a diffraction-limited detector [J/K]
     def aniPower(self, freq, temp, emissivity=1.0):
         freq, temp, emissivity = self.__checkInputs(freq, [temp, emissivity])
         return np.trapz(self.aniPowSpec(freq, temp, emissivity), freq)
 
+    #Hit and miss counts of the shared spectrum cache
+    def cacheStats(self):
+        return {'hits': specStats['hits'], 'misses': specStats['misses'], 'size': len(specCache)}
+
     #***** Private Methods *****
+    #Emissivity-free spectrum at one temperature, from the shared LRU cache keyed on the frequency grid contents
+    def __spectrum(self, kind, freq, temp):
+        if np.isnan(temp): return self.__kernel(kind, freq, temp)
+        key = (kind, freq.dtype.str, freq.tostring(), temp)
+        if key in specCache:
+            specStats['hits'] += 1
+            spec = specCache.pop(key); specCache[key] = spec #Mark as most recently used
+            return spec
+        specStats['misses'] += 1
+        spec = self.__kernel(kind, freq, temp)
+        spec.flags.writeable = False
+        specCache[key] = spec
+        while len(specCache) > maxSpecs: specCache.popitem(last=False)
+        return spec
+
+    #Emissivity-free spectrum at one temperature, evaluated without the cache
+    def __kernel(self, kind, freq, temp):
+        if kind == 'bbPowSpec': return self.__bbPowKernel( freq, temp, 1.0)
+        else:                   return self.__aniPowKernel(freq, temp, 1.0)
+
+    #Blackbody power spectrum, evaluated in place in a fresh buffer
+    def __bbPowKernel(self, freq, temp, emissivity):
+        if kr.compiled(): return kr.bbPowSpec(freq, temp, emissivity, self.h, self.kB, self.c)
+        return self.__mul(0.5*self.AOmega(freq), self.bbSpecRad(freq, temp, emissivity))
+
+    #Blackbody dP/dT spectrum, evaluated in place in a fresh buffer
+    def __aniPowKernel(self, freq, temp, emissivity):
+        if kr.compiled(): return kr.aniPowSpec(freq, temp, emissivity, self.h, self.kB)
+        ret = self.nOcc(freq, temp)
+        if np.ndim(ret): np.square(ret, out=ret)
+        else:            ret = ret**2
+        ret = self.__mul(((self.h**2)/self.kB)*emissivity, ret)
+        ret = self.__mul((freq**2)/(temp**2),              ret)
+        return self.__mul(np.exp((self.h*freq)/(self.kB*temp)), ret)
+
+    #Single temperature of a scalar or constant temperature array on a 1D frequency grid, or None
+    def __uniform(self, freq, temp):
+        if not isinstance(freq, np.ndarray) or freq.ndim != 1 or len(freq) < 2: return None
+        if isinstance(temp, np.ndarray):
+            if temp.shape != freq.shape or temp[0] != temp[-1] or np.any(temp != temp[0]): return None
+            return float(temp[0])
+        return float(temp)
+
+    #Lists become arrays and callables are evaluated, while scalars and arrays are left to broadcast against x
     def __checkInputs(self, x, inputs=None):
-        retArr = []
-        if isinstance(x, np.ndarray) or isinstance(x, list):
-            x = np.array(x)
-            if inputs is None:
-                return x
-            retArr.append(x)
-            for input in inputs:
-                if callable(input): 
-                    retArr.append(input(x))
-                elif isinstance(input, np.ndarray) or isinstance(input, list):
-                    retArr.append(np.array(input))
-                elif isinstance(input, int) or isinstance(input, float):
-                    retArr.append(np.array([input for i in x]))
-                else:
-                    raise Exception("Non-numeric value %s passed in Physics" % (str(x)))
-        elif isinstance(x, int) or isinstance(x, float):
-            if inputs is None:
-                return x
-            retArr.append(x)
-            for input in inputs:
-                if callable(input):
-                    retArr.append(input(x))
-                elif isinstance(input, int) or isinstance(input, float):
-                    retArr.append(input)
-                else:
-                    retArr.append(input)
-        else:
+        if isinstance(x, list): x = np.array(x)
+        if not isinstance(x, (np.ndarray, int, long, float, np.number)):
             raise Exception("Non-numeric value %s passed in Physics" % (str(x)))
+        if inputs is None:
+            return x
+        retArr = [x]
+        for input in inputs:
+            if callable(input):
+                retArr.append(input(x))
+            elif isinstance(input, list):
+                retArr.append(np.array(input))
+            elif isinstance(input, (np.ndarray, int, long, float, np.number)) or not isinstance(x, np.ndarray):
+                retArr.append(input)
+            else:
+                raise Exception("Non-numeric value %s passed in Physics" % (str(x)))
         return retArr
+
+    #Multiply a into b, reusing b as the output buffer when it already has the broadcast shape
+    def __mul(self, a, b):
+        if isinstance(b, np.ndarray) and b.shape == np.broadcast(a, b).shape and b.dtype == np.result_type(a, b):
+            return np.multiply(a, b, out=b)
+        return a*b
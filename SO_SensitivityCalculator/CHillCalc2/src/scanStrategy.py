@@ -22,6 +22,12 @@ class ScanStrategy:
     def elvSample(self):
         if self.elv is not None: return self.elv
         else:                    return np.random.choice(self.elVals, size=1, p=self.elFrac/np.sum(self.elFrac))[0]
+    def elvDist(self):
+        if self.elv is not None: return np.array([self.elv]), np.array([1.])
+        else:                    return self.elVals, self.elFrac/np.sum(self.elFrac)
+    def elvSupport(self):
+        if self.elv is not None: return np.array([self.elv])
+        else:                    return self.elVals[self.elFrac > 0.]
     def getElv(self):
         return self.elv
     def getMedianElv(self):
@@ -0,0 +1,89 @@
+#python Version 2.7.2
+import numpy     as np
+import itertools as it
+import gzip      as gz
+
+#Running count, mean, variance, and extrema of a stream, merged one chunk at a time
+class Running:
+    def __init__(self):
+        self.n    = 0
+        self.mean = 0.
+        self.m2   = 0.
+        self.min  = np.inf
+        self.max  = -np.inf
+
+    #***** Public Methods *****
+    def update(self, x):
+        x = np.array(x, dtype=np.float).flatten()
+        if not len(x): return
+        n = len(x); mean = np.mean(x); m2 = np.sum((x - mean)**2)
+        tot   = self.n + n
+        delta = mean - self.mean
+        self.mean += delta*n/float(tot)
+        self.m2   += m2 + delta**2*self.n*n/float(tot)
+        self.n     = tot
+        self.min   = min(self.min, np.min(x))
+        self.max   = max(self.max, np.max(x))
+    def std(self):
+        if self.n == 0: return 0.
+        return np.sqrt(self.m2/self.n)
+
+#Class for streaming a season of weather timesteps through the vectorized sensitivity in fixed-size chunks
+class Season:
+    def __init__(self, log, sens, chunk=256):
+        self.log   = log
+        self.sens  = sens
+        self.chunk = int(chunk)
+
+    #***** Public Methods *****
+    #Generate (PWV, elevation) chunks, either read from a season file or drawn from the weather distribution
+    def steps(self, wth=None, nstep=None, seasonFile=None):
+        if seasonFile is not None:
+            f = open(seasonFile)
+            lines = (line for line in f if line.strip() and not line.lstrip().startswith('#'))
+            while True:
+                block = list(it.islice(lines, self.chunk))
+                if not len(block): break
+                arr = np.loadtxt(block, usecols=[0,1], ndmin=2)
+                yield arr[:,0], arr[:,1]
+            f.close()
+        else:
+            for n in range(0, nstep, self.chunk):
+                yield wth.sample(min(self.chunk, nstep - n))
+
+    #Generate per-timestep (PWV, elevation, optical power, NEP, NET, array NET) for one channel
+    def stream(self, ch, tp, steps):
+        for pwv, elv in steps:
+            pwv = np.clip(pwv, ch.sky.minPWV, ch.sky.maxPWV)
+            popt, nep, net, netArr = self.sens.stream(ch, tp, pwv, elv)
+            yield pwv, elv, popt, nep, net, netArr
+
+    #Consume a stream, keeping only running aggregates and optionally appending a compressed time series
+    def run(self, ch, tp, steps, tsFile=None):
+        aggs = {'PWV': Running(), 'Elevation': Running(), 'Optical Power': Running(), 'Detector NEP': Running(), 'Detector NET': Running(), 'Array NET': Running()}
+        invVar = 0.
+        if tsFile is not None: f = gz.open(tsFile, 'wb')
+        for pwv, elv, popt, nep, net, netArr in self.stream(ch, tp, steps):
+            aggs['PWV'].update(pwv)
+            aggs['Elevation'].update(elv)
+            aggs['Optical Power'].update(popt)
+            aggs['Detector NEP'].update(nep)
+            aggs['Detector NET'].update(net)
+            aggs['Array NET'].update(netArr)
+            invVar += np.sum(1./np.power(netArr, 2.))
+            if tsFile is not None: np.save(f, np.transpose([pwv, elv, np.mean(popt, axis=1), np.mean(net, axis=1), netArr]).astype(np.float32))
+        if tsFile is not None: f.close()
+        #Array NET over the season, weighting every timestep by its inverse variance
+        aggs['Season NET'] = np.sqrt(aggs['Array NET'].n/invVar) if invVar > 0. else np.inf
+        self.log.log('Streamed %d timesteps for channel %s' % (aggs['PWV'].n, ch.name), 2)
+        return aggs
+
+    #Generate the chunks of a compressed time series written by run(), as (PWV, elevation, optical power, NET, array NET) columns
+    def series(self, tsFile):
+        f = gz.open(tsFile, 'rb')
+        while True:
+            try:
+                yield np.load(f)
+            except (IOError, ValueError):
+                break
+        f.close()
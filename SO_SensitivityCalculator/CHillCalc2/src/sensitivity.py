@@ -2,6 +2,7 @@
 import numpy   as np
 import physics as ph
 import noise   as ns
+import kernels as kr
 import units   as un
 
 class Sensitivity:
@@ -13,53 +14,122 @@ class Sensitivity:
 
     #***** Public Methods *****
     def Popt(self, elemArr, emissArr, effArr, tempArr, freqs):
-        effArr  = np.insert(effArr, len(effArr), [1. for f in freqs], axis=0); effArr = np.array(effArr).astype(np.float)
-        return np.sum([np.trapz(self.__ph.bbPowSpec(freqs, tempArr[i], emissArr[i]*np.prod(effArr[i+1:], axis=0)), freqs) for i in range(len(elemArr))])
+        return kr.trapz(np.sum(self.powSpectra(np.array(emissArr, dtype=np.float), np.array(effArr, dtype=np.float), np.array(tempArr, dtype=np.float), freqs), axis=0), freqs)
 
     def NEPph(self, elemArr, emissArr, effArr, tempArr, freqs, ch=None):
-        effArr  = np.insert(effArr, len(effArr), [1. for f in freqs], axis=0); effArr = np.array(effArr).astype(np.float)
         if ch: corrs = True
         else:  corrs = False
-        powInts = np.array([self.__ph.bbPowSpec(freqs, tempArr[i], emissArr[i]*np.prod(effArr[i+1:], axis=0)) for i in range(len(elemArr))])
-        if corrs: NEP_ph, NEP_pharr = self.__nse.photonNEP(powInts, freqs, elemArr, (ch.pixSize/(ch.Fnumber*self.__ph.lamb(ch.bandCenter.getAvg()))))
+        powInts = self.powSpectra(np.array(emissArr, dtype=np.float), np.array(effArr, dtype=np.float), np.array(tempArr, dtype=np.float), freqs)
+        if corrs: NEP_ph, NEP_pharr = self.__nse.photonNEP(powInts, freqs, factors=self.corrFactors(ch, elemArr))
         else:     NEP_ph, NEP_pharr = self.__nse.photonNEP(powInts, freqs)
         return NEP_ph, NEP_pharr
 
+    #Bose correlation factors, computed once per channel and element list since the pixel pitch is fixed per channel
+    def corrFactors(self, ch, elemArr):
+        key = tuple(elemArr)
+        if key not in ch.corrFacts: ch.corrFacts[key] = self.__nse.corrFactors(elemArr, ch.pixSize/(ch.Fnumber*self.__ph.lamb(ch.bandCenter.getAvg())))
+        return ch.corrFacts[key]
+
+    #Bolometer NEP for the detectors in a DetectorArray, broadcasting over the trailing detector axis of cumPower
     def NEPbolo(self, cumPower, det):
-        if 'NA' in str(det.psat): return self.__nse.bolometerNEP(det.psatFact*cumPower, det.n, det.Tc, det.Tb)
-        else:                     return self.__nse.bolometerNEP(det.psat,              det.n, det.Tc, det.Tb)    
-    
+        with np.errstate(invalid='ignore'):
+            return self.__nse.bolometerNEP(np.where(np.isnan(det.psat), det.psatFact*cumPower, det.psat), det.n, det.Tc, det.Tb)
+
+    #Readout NEP for the detectors in a DetectorArray, NaN where the SQUID NEI or bolometer resistance is missing
     def NEPrd(self, cumPower, det):
-        if   'NA' in str(det.nei):   return 'NA'
-        elif 'NA' in str(det.boloR): return 'NA'
-        elif 'NA' in str(det.psat):  return self.__nse.readoutNEP((det.psatFact-1.)*cumPower, det.boloR, det.nei)
-        else:
-            if cumPower >= det.psat: return 0.
-            else:                    return self.__nse.readoutNEP((det.psat-cumPower),       det.boloR, det.nei)
-    
+        with np.errstate(invalid='ignore'):
+            NEPrdPsatFact = self.__nse.readoutNEP((det.psatFact-1.)*cumPower, det.boloR, det.nei)
+            NEPrdPsat     = np.where(cumPower >= det.psat, 0., self.__nse.readoutNEP(np.clip(det.psat-cumPower, 0., None), det.boloR, det.nei))
+        return np.where(np.isnan(det.nei) | np.isnan(det.boloR), np.nan, np.where(np.isnan(det.psat), NEPrdPsatFact, NEPrdPsat))
+
     def sensitivity(self, ch, tp, corr=None):
+        powers, cumEff, effic = self.__spectra(ch)
+        return self.__sensitivity(ch, tp, powers, cumEff, effic, corr)
+
+    #Sensitivity and optical-power table for one channel, sharing a single evaluation of the element spectra
+    def loading(self, ch, tp, corr=None):
+        powers, cumEff, effic = self.__spectra(ch)
+        return self.__sensitivity(ch, tp, powers, cumEff, effic, corr), self.__opticalPower(ch, powers, cumEff, effic)
+
+    #Vectorized loading and noise for a chunk of weather timesteps, swapping each (PWV, elevation) into the ATM element of the first observation
+    def stream(self, ch, tp, pwvs, elvs, corr=None):
         if corr is None: corr = self.__corr
+        nt = len(pwvs)
 
-        ApEff             = ch.apEff
-        PoptArr           = np.array([[self.Popt(   ch.elem[i][j], ch.emiss[i][j], ch.effic[i][j], ch.temp[i][j], ch.freqs)     for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
-        if corr: NEPPhArr = np.array([[self.NEPph(  ch.elem[i][j], ch.emiss[i][j], ch.effic[i][j], ch.temp[i][j], ch.freqs, ch) for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
-        else:    NEPPhArr = np.array([[self.NEPph(  ch.elem[i][j], ch.emiss[i][j], ch.effic[i][j], ch.temp[i][j], ch.freqs)     for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
-        NEPboloArr        = np.array([[self.NEPbolo(PoptArr[i][j],                                ch.detArray.detectors[j])     for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
-        NEPrdArr          = np.array([[self.NEPrd(  PoptArr[i][j],                                ch.detArray.detectors[j])     for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
-        
-        NEPPhArr, NEPPhArrArr = np.split(NEPPhArr, 2, axis=2)
-        NEPPhArr    = np.reshape(NEPPhArr,    np.shape(NEPPhArr)[   :2])
-        NEPPhArrArr = np.reshape(NEPPhArrArr, np.shape(NEPPhArrArr)[:2])
+        #Only the sky elements up to the ATM change with the weather, so everything detector-side of it is computed once
+        atmTemp, atmTran = ch.sky.atmSpectra(pwvs, elvs, ch.freqs)
+        iatm   = list(ch.elem).index('ATM'); nSky = iatm + 1
+        emiss, effic, temp = [arr[0] for arr in ch.tensors(slice(0, 1), dtype=np.float)]
+        cumEff = self.__cumEff(effic)
+        optPow = self.__ph.bbPowSpec(ch.freqs, temp[:,nSky:], emiss[:,nSky:]*cumEff[:,nSky:])
+
+        #Sky element arrays of shape (timestep, detector, element, frequency)
+        skyTemp = np.repeat(temp[ np.newaxis,:,:nSky], nt, axis=0); skyTemp[:,:,iatm] = atmTemp[:,np.newaxis]
+        skyEff  = np.repeat(effic[np.newaxis,:,:nSky], nt, axis=0); skyEff[ :,:,iatm] = atmTran[:,np.newaxis]
+        skyCum  = self.__cumEff(skyEff)*cumEff[np.newaxis,:,iatm:nSky]
+        skyPow  = self.__ph.bbPowSpec(ch.freqs, skyTemp, emiss[np.newaxis,:,:nSky]*skyCum)
+        powInts = np.concatenate([skyPow, np.broadcast_to(optPow, (nt,)+optPow.shape)], axis=2)
+        PoptArr = kr.trapz(np.sum(powInts, axis=2), ch.freqs)
+
+        if corr: NEPPhArr, NEPPhArrArr = self.__nse.photonNEP(powInts, ch.freqs, factors=self.corrFactors(ch, ch.elem))
+        else:    NEPPhArr, NEPPhArrArr = self.__nse.photonNEP(powInts, ch.freqs)
+
+        NEPboloArr, NEPrdArr = self.__detNEP(ch, PoptArr, NEPPhArr)
+
+        NEP    = np.sqrt(NEPPhArr**2    + NEPboloArr**2 + NEPrdArr**2)
+        NEParr = np.sqrt(NEPPhArrArr**2 + NEPboloArr**2 + NEPrdArr**2)
+        dpdt   = self.__nse.dPdT(np.prod(skyEff, axis=2)*np.prod(effic[:,nSky:], axis=1), ch.freqs)
+        NET    = NEP/(np.sqrt(2.)*dpdt)*tp.netMgn
+        NETar  = NEParr/(np.sqrt(2.)*dpdt)*tp.netMgn
+        NETarr = 1./np.sqrt(np.sum(1./np.power(NETar, 2.), axis=1))*np.sqrt(float(ch.clcDet)/float(ch.detYield*ch.numDet))
+        return PoptArr, NEP, NET, NETarr
+
+    def opticalPower(self, ch, tp):
+        powers, cumEff, effic = self.__spectra(ch)
+        return self.__opticalPower(ch, powers, cumEff, effic)
+
+    #Power spectrum of each element on the detector for stacked (..., element, frequency) arrays
+    def powSpectra(self, emissArr, effArr, tempArr, freqs):
+        return self.__ph.bbPowSpec(freqs, tempArr, emissArr*self.__cumEff(effArr))
+
+    #***** Private Methods *****
+    #Emitted power spectrum of every element, the efficiency between it and the detector, and its own efficiency, as (observation, detector, element, frequency).
+    #Elements are taken one at a time from the detector side on their compact shapes, so the cumulative efficiency stays a single frequency bin while everything after it is flat
+    def __spectra(self, ch):
+        emiss, effic, temp = ch.elements(dtype=np.float)
+        shape  = (ch.nobs, ch.detArray.nDet, len(ch.elem), len(ch.freqs))
+        powers = np.empty(shape); cumEff = np.empty(shape); effArr = np.empty(shape)
+        cum    = np.ones(1)
+        for k in reversed(range(len(ch.elem))):
+            powers[:,:,k] = self.__power(ch.freqs, temp[k], emiss[k])
+            cumEff[:,:,k] = cum
+            effArr[:,:,k] = effic[k]
+            cum           = cum*effic[k]
+        return powers, cumEff, effArr
+
+    #Emitted power spectrum of one element, from the shared spectrum cache when it has a single temperature, and otherwise once per distinct row, such as the ATM once per observation
+    def __power(self, freqs, temp, emiss):
+        if temp.size and np.all(temp == temp.flat[0]): return self.__ph.bbPowSpec(freqs, float(temp.flat[0]), emiss)
+        return self.__ph.bbPowSpec(freqs, temp, emiss)
+
+    def __sensitivity(self, ch, tp, powers, cumEff, effic, corr=None):
+        if corr is None: corr = self.__corr
+
+        #Power spectrum of every element on every detector in every observation
+        powInts           = powers*cumEff
+        PoptArr           = kr.trapz(np.sum(powInts, axis=2), ch.freqs)
+        if corr: NEPPhArr, NEPPhArrArr = self.__nse.photonNEP(powInts, ch.freqs, factors=self.corrFactors(ch, ch.elem))
+        else:    NEPPhArr, NEPPhArrArr = self.__nse.photonNEP(powInts, ch.freqs)
+        NEPboloArr, NEPrdArr  = self.__detNEP(ch, PoptArr, NEPPhArr)
 
-        #if 'NA' in NEPrdArr: NEPrdArr = np.array([[np.sqrt(0.21)*np.sqrt(NEPPhArr[i][j]**2    + NEPboloArr[i][j]**2) for j in range(len(NEPrdArr[i]))] for i in range(len(NEPrdArr))])
-        #if 'NA' in NEPrdArr: NEPrdArr = np.array([[0.0 for j in range(len(NEPrdArr[i]))] for i in range(len(NEPrdArr))])
-        if 'NA' in NEPrdArr: NEPrdArr = np.array([[np.sqrt((1. + ch.detArray.detectors[j].readN)**2 - 1.)*np.sqrt(NEPPhArr[i][j]**2 + NEPboloArr[i][j]**2) for j in range(ch.detArray.nDet)] for i in range(ch.nobs)])
         NEP        = np.sqrt(NEPPhArr**2    + NEPboloArr**2 + NEPrdArr**2)
         NEParr     = np.sqrt(NEPPhArrArr**2 + NEPboloArr**2 + NEPrdArr**2)
-        NET        = np.array([[self.__nse.NETfromNEP(NEP[i][j],    ch.freqs, np.prod(ch.effic[i][j], axis=0)) for j in range(ch.detArray.nDet)] for i in range(ch.nobs)]).flatten()*tp.netMgn
-        NETar      = np.array([[self.__nse.NETfromNEP(NEParr[i][j], ch.freqs, np.prod(ch.effic[i][j], axis=0)) for j in range(ch.detArray.nDet)] for i in range(ch.nobs)]).flatten()*tp.netMgn
-        NETarr     = self.__ph.invVar(NETar)*np.sqrt(float(ch.nobs))*np.sqrt(float(ch.clcDet)/float(ch.detYield*ch.numDet))
-        NETarrStd  = np.std(NET)*np.sqrt(1./ch.numDet)
+        dpdt       = np.sqrt(2.)*self.__nse.dPdT(np.prod(effic, axis=2), ch.freqs)
+        NET        = (NEP/dpdt).flatten()*tp.netMgn
+        NETar      = (NEParr/dpdt).flatten()*tp.netMgn
+        wgt        = np.repeat(ch.obsSet.weights, ch.detArray.nDet)
+        NETarr     = self.__ph.invVar(NETar/np.sqrt(wgt))*np.sqrt(float(ch.clcDet)/float(ch.detYield*ch.numDet))
+        NETarrStd  = self.__std(NET, wgt)*np.sqrt(1./ch.numDet)
         MS         = 1./np.power(NETarr,    2.)
         MSStd      = abs(1./np.power(NETarr+NETarrStd, 2.) - 1./np.power(NETarr-NETarrStd, 2.))/2.
         
@@ -67,77 +137,66 @@ class Sensitivity:
         SensStd    = self.__nse.sensitivity(NETarrStd, tp.fsky, tp.tobs*tp.obsEff)
 
         means = [ch.apEff,
-                 np.mean(PoptArr.flatten()),
-                 np.mean(NEPPhArr.flatten()),  
-                 np.mean(NEPboloArr.flatten()),
-                 np.mean(NEPrdArr.flatten()),  
-                 np.mean(NEP.flatten()),        
-                 np.mean(NET),                 
+                 np.average(PoptArr.flatten(), weights=wgt),
+                 np.average(NEPPhArr.flatten(), weights=wgt),
+                 np.average(NEPboloArr.flatten(), weights=wgt),
+                 np.average(NEPrdArr.flatten(), weights=wgt),
+                 np.average(NEP.flatten(), weights=wgt),
+                 np.average(NET, weights=wgt),
                  NETarr,              
                  MS,
                  Sens]        
         stds  = [0.,
-                 np.std(PoptArr.flatten()),
-                 np.std(NEPPhArr.flatten()),    
-                 np.std(NEPboloArr.flatten()),  
-                 np.std(NEPrdArr.flatten()),   
-                 np.std(NEP.flatten()),     
-                 np.std(NET),          
+                 self.__std(PoptArr.flatten(), wgt),
+                 self.__std(NEPPhArr.flatten(), wgt),
+                 self.__std(NEPboloArr.flatten(), wgt),
+                 self.__std(NEPrdArr.flatten(), wgt),
+                 self.__std(NEP.flatten(), wgt),
+                 self.__std(NET, wgt),
                  NETarrStd,
                  MSStd,
                  SensStd]                            
 
         return means, stds
 
-    def opticalPower(self, ch, tp):
-        powSkySide = []
-        powDetSide = []
-        effDetSide = []
-        for i in range(len(ch.elem)):
-            powSkySide1 = []
-            powDetSide1 = []
-            effDetSide1 = []
-            for j in range(len(ch.elem[i])):
-                powers      = []
-                powSkySide2 = []
-                powDetSide2 = []
-                effSkySide2 = []
-                effDetSide2 = []
-                #Store efficiency towards sky and towards detector
-                for k in range(len(ch.elem[i][j])):
-                    effArr = np.vstack([ch.effic[i][j], np.array([1. for f in ch.freqs])])
-                    cumEffDet = reduce(lambda x, y: x*y, effArr[k+1:])
-                    effDetSide2.append(cumEffDet)
-                    if   k == 0: cumEffSky = [[0. for f in ch.freqs]]                         #Nothing sky-side
-                    elif k == 1: cumEffSky = [[1. for f in ch.freqs], [0. for f in ch.freqs]] #Only one element sky-side
-                    else:        cumEffSky = [reduce(lambda x, y: x*y, effArr[m+1:k]) if m < k-2 else effArr[m+1] for m in range(k-1)] + [[1. for f in ch.freqs], [0. for f in ch.freqs]]
-                    effSkySide2.append(np.array(cumEffSky))
-                    pow = self.__ph.bbPowSpec(ch.freqs, ch.temp[i][j][k], ch.emiss[i][j][k])
-                    powers.append(pow)
-                #Store power from sky and power on detector
-                for k in range(len(ch.elem[i][j])):
-                    powOut = np.trapz(powers[k]*effDetSide2[k]*ch.bandMask, ch.freqs)
-                    effDetSide2[k] = np.trapz(effDetSide2[k]*ch.bandMask, ch.freqs)/ch.bandDeltaF
-                    powDetSide2.append(powOut)
-                    powIn = sum([np.trapz(powers[m]*effSkySide2[k][m]*ch.bandMask, ch.freqs) for m in range(k+1)])
-                    powSkySide2.append(powIn)
-                powSkySide1.append(powSkySide2)
-                powDetSide1.append(powDetSide2)
-                effDetSide1.append(effDetSide2)
-            powSkySide.append(powSkySide1)
-            powDetSide.append(powDetSide1)
-            effDetSide.append(effDetSide1)
+    def __opticalPower(self, ch, powers, cumEff, effic):
+        #Power incident on each element from the sky side, accumulated one element at a time as skyPow[k+1] = skyPow[k]*effic[k] + powers[k]
+        skyPow = np.zeros(np.shape(powers))
+        for k in range(1, np.shape(powers)[2]):
+            skyPow[:,:,k] = skyPow[:,:,k-1]*effic[:,:,k-1] + powers[:,:,k-1]
+        powSkySide = np.trapz(skyPow*ch.bandMask,          ch.freqs)
+        powDetSide = np.trapz(powers*cumEff*ch.bandMask,   ch.freqs)
+        effDetSide = np.trapz(cumEff*ch.bandMask,          ch.freqs)/ch.bandDeltaF
         #Build table of optical powers and efficiencies for each element
         shape = np.shape(powSkySide)
         newshape = (shape[0]*shape[1], shape[2])
         powSkySide = np.transpose(np.reshape(powSkySide, newshape))
         powDetSide = np.transpose(np.reshape(powDetSide, newshape))
         effDetSide = np.transpose(np.reshape(effDetSide, newshape))
-        means = [np.mean(powSkySide, axis=1),
-                 np.mean(powDetSide, axis=1),
-                 np.mean(effDetSide, axis=1)]
-        stds  = [np.std(powSkySide,  axis=1),
-                 np.std(powDetSide,  axis=1),
-                 np.std(effDetSide,  axis=1)]
-        #print means
+        wgt = np.repeat(ch.obsSet.weights, shape[1])
+        means = [np.average(powSkySide, axis=1, weights=wgt),
+                 np.average(powDetSide, axis=1, weights=wgt),
+                 np.average(effDetSide, axis=1, weights=wgt)]
+        stds  = [self.__std(powSkySide, wgt, axis=1),
+                 self.__std(powDetSide, wgt, axis=1),
+                 self.__std(effDetSide, wgt, axis=1)]
         return means, stds
+
+    #Efficiency between each element and the detector for stacked (..., element, frequency) arrays, from one reversed cumulative product
+    def __cumEff(self, effArr):
+        cumEff = np.cumprod(effArr[...,::-1,:], axis=-2)[...,::-1,:]
+        return np.concatenate([cumEff[...,1:,:], np.ones(np.shape(cumEff)[:-2]+(1,)+np.shape(cumEff)[-1:])], axis=-2)
+
+    #Bolometer and readout NEP for (..., detector) arrays of optical power and photon NEP, falling back to the read noise fraction where the readout NEP is missing
+    def __detNEP(self, ch, PoptArr, NEPPhArr):
+        dets       = ch.detArray
+        NEPboloArr = self.NEPbolo(PoptArr, dets)
+        NEPrdArr   = self.NEPrd(PoptArr, dets)
+        NEPrdArr   = np.where(np.isnan(NEPrdArr), np.sqrt((1. + dets.readN)**2 - 1.)*np.sqrt(NEPPhArr**2 + NEPboloArr**2), NEPrdArr)
+        return NEPboloArr, NEPrdArr
+
+    #Standard deviation over observations weighted by their probability
+    def __std(self, arr, wgt, axis=None):
+        mean = np.average(arr, axis=axis, weights=wgt)
+        if axis is not None: mean = np.expand_dims(mean, axis)
+        return np.sqrt(np.average((arr - mean)**2, axis=axis, weights=wgt))
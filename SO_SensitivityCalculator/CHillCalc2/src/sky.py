@@ -1,26 +1,28 @@
 #python Version 2.7.2
 import numpy       as np
-import glob        as gb
 import pickle      as pk
+import collections as cl
 import foregrounds as fg
-import units       as un
+import atmosphere  as at
 import os
 
 class Sky:
-    def __init__(self, log, nrealize=1, fgndDict=None, atmFile=None, pwv=None, generate=False, foregrounds=False):
+    def __init__(self, log, nrealize=1, fgndDict=None, atmFile=None, pwv=None, scn=None, generate=False, foregrounds=False, maxAtmCells=2048):
         self.__log      = log
+        self.__scn      = scn
         self.__generate = generate
         self.__inclF    = foregrounds
         self.__fg       = fg.Foregrounds(fgndDict=fgndDict, nrealize=nrealize)
-        self.__nfiles   = 10 #Number of files to break the atmDict.pkl file into
+        self.__atmTabs  = {}          #ATM grid cells resampled onto each channel's frequency grid
+        self.__maxCells = maxAtmCells #LRU bound on the number of cells kept per frequency grid
 
         self.atmFile   = atmFile
         self.pwv       = pwv
         self.medianPwv = 0.934 #Atacama
         self.maxPWV    = 8.0
         self.minPWV    = 0.0
-        self.pklDir    = '/'.join(os.path.abspath(__file__).split('/')[:-1])+'/atmFiles/PKL/'
-        self.txtDir    = '/'.join(os.path.abspath(__file__).split('/')[:-1])+'/atmFiles/TXT/'
+        self.atmDir    = '/'.join(os.path.abspath(__file__).split('/')[:-1])+'/atmFiles/'
+        self.pklDir    = self.atmDir+'PKL/'
 
         self.__initATM()
         self.__initATMDist()
@@ -28,7 +30,7 @@ class Sky:
     #***** Public methods ******
     def pwvSample(self):
         if self.pwv is not None: return self.pwv
-        samp = np.random.choice(self.__pdfDict.keys(), size=1, p=self.__pdfDict.values()/np.sum(self.__pdfDict.values()))[0]
+        samp = np.random.choice(self.__pwvVals, size=1, p=self.__pwvProb)[0]
         if samp < self.minPWV:
             self.__log.log('Cannot have PWV %.1f < %.1f. Using %.1f instead' % (samp, self.minPWV, self.minPWV), 2)
             return self.minPWV
@@ -37,29 +39,59 @@ class Sky:
             return self.maxPWV
         else:
             return samp
+    def pwvDist(self):
+        if self.pwv is not None: return np.array([self.pwv]), np.array([1.])
+        else:                    return self.__pwvVals, self.__pwvProb
+    def pwvSupport(self):
+        vals, prob = self.pwvDist()
+        return np.unique(np.clip(vals[prob > 0.], self.minPWV, self.maxPWV))
     def getPwv(self):
         return self.pwv
     def getMedianPwv(self):
         return self.medianPwv
 
     def atmSpectrum(self, pwv, elev, freqs):
-        if self.atmFile:
-            self.__log.log('Using provided ATM file -- ignoring provided PWV and El (%.1f, %.1f)' % (pwv, elev), 1)
-            freq, temp, tran = np.loadtxt(self.atmFile, unpack=True, usecols=[0, 2, 3], dtype=np.float)
-        else:
-            freq, temp, tran = self.atmDict[(int(round(elev,0)), round(pwv,1))]
-        freq = freq*un.GHzToHz; temp = np.interp(freqs, freq, temp); tran = np.interp(freqs, freq, tran)
-        return freq.flatten().tolist(), temp.flatten().tolist(), tran.flatten().tolist()
+        temp, tran = self.atmSpectra([pwv], [elev], freqs)
+        return freqs, temp[0], tran[0]
+    def atmSpectra(self, pwvs, elevs, freqs):
+        if self.atmFile: spec = np.tile(self.atmTable(freqs), (len(pwvs), 1, 1))
+        else:            spec = self.atm.interp(self.atmCells(freqs, self.atm.cells(pwvs, elevs)), pwvs, elevs)
+        return spec[:,:,0], spec[:,:,1]
+    def atmTable(self, freqs):
+        #Keyed on the file's modification time too, so that an edited custom ATM file is parsed and resampled again
+        key = (os.path.getmtime(self.atmFile),) + self.__gridKey(freqs)
+        if key not in self.__atmTabs:
+            for old in [k for k in self.__atmTabs.keys() if k[1:] == key[1:]]: del self.__atmTabs[old]
+            freq, temp, tran = at.customSpectrum(self.atmFile)
+            self.__atmTabs[key] = np.transpose([np.interp(freqs, freq, temp), np.interp(freqs, freq, tran)])
+        return self.__atmTabs[key]
+    def atmCells(self, freqs, cells):
+        key = self.__gridKey(freqs)
+        if key not in self.__atmTabs:
+            #Load every cell reachable by the scan strategy and PWV distribution up front, up to the LRU bound
+            self.__atmTabs[key] = cl.OrderedDict()
+            if self.__scn is not None: reach = self.atm.cells(self.pwvSupport(), self.__scn.elvSupport())
+            else:                      reach = self.atm.cells(self.pwvSupport(), self.atm.elvArr)
+            self.atmCells(freqs, reach[:self.__maxCells])
+        lru  = self.__atmTabs[key]
+        miss = [c for c in cells if c not in lru]
+        if len(miss):
+            tab = self.atm.table(np.array(freqs), [c[0] for c in miss], [c[1] for c in miss])
+            for n in range(len(miss)): lru[miss[n]] = tab[n]
+        ret = {}
+        for c in cells: ret[c] = lru.pop(c); lru[c] = ret[c] #Mark as most recently used
+        while len(lru) > self.__maxCells: lru.popitem(last=False)
+        return ret
     def synSpectrum(self, freqs):
         return self.__fg.syncSpecRad(1.0, freqs)
     def dstSpectrum(self, freqs):
         return self.__fg.dustSpecRad(1.0, freqs)
     def generate(self, pwv, elev, freqs):
-        self.Ncmb = ['CMB' for f in freqs]; self.Tcmb = [2.725 for f in freqs]; self.Ecmb = [1. for f in freqs]; self.Acmb = [1. for f in freqs]
-        self.Natm = ['ATM' for f in freqs]; freq, self.Tatm, self.Eatm = self.atmSpectrum(pwv, elev, freqs);     self.Aatm = [1. for f in freqs]
+        self.Ncmb = 'CMB'; self.Tcmb = 2.725; self.Ecmb = 1.; self.Acmb = 1.
+        self.Natm = 'ATM'; freq, self.Tatm, self.Eatm = self.atmSpectrum(pwv, elev, freqs); self.Aatm = 1.
         if self.__inclF:
-            self.Nsyn = ['SYNC' for f in freqs]; self.Tsyn = self.synSpectrum(freqs); self.Esyn = [1. for f in freqs]; self.Asyn = [1. for f in freqs]
-            self.Ndst = ['DUST' for f in freqs]; self.Tdst = self.dstSpectrum(freqs); self.Edst = [1. for f in freqs]; self.Adst = [1. for f in freqs]
+            self.Nsyn = 'SYNC'; self.Tsyn = self.synSpectrum(freqs); self.Esyn = 1.; self.Asyn = 1.
+            self.Ndst = 'DUST'; self.Tdst = self.dstSpectrum(freqs); self.Edst = 1.; self.Adst = 1.
             return ([self.Ncmb, self.Nsyn, self.Ndst, self.Natm],
                     [self.Acmb, self.Asyn, self.Adst, self.Aatm],
                     [self.Ecmb, self.Esyn, self.Edst, self.Eatm],
@@ -70,28 +102,30 @@ class Sky:
                     [self.Ecmb, self.Eatm],
                     [self.Tcmb, self.Tatm])
 
+    #Resampled ATM tables are cheap to rebuild, so do not ship them between processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_Sky__atmTabs'] = {}
+        return state
+
     #***** Private methods *****
+    #Resampled tables are keyed on the frequency grid contents, since grids can share their length and end points
+    def __gridKey(self, freqs):
+        freqs = np.asarray(freqs)
+        return (freqs.dtype.str, freqs.tostring())
+
     def __initATM(self):
-        if self.__generate:
-            atmFileArr                               = sorted(gb.glob(self.txtDir+"atm*.txt"))
-            self.elevArr                             = np.array([float(atmFile.split('/')[-1].split('_')[1][:2])                                        for atmFile in atmFileArr])
-            self.pwvArr                              = np.array([float(atmFile.split('/')[-1].split('_')[2][:4])*1e-3                                   for atmFile in atmFileArr])
-            self.freqArr, self.tempArr, self.tranArr = np.hsplit(np.array([np.loadtxt(atmFile, usecols=[0, 2, 3], unpack=True)                          for atmFile in atmFileArr]), 3)
-            self.atmDict                             = {(int(round(self.elevArr[i])), round(self.pwvArr[i],1)): (self.freqArr[i][0], self.tempArr[i][0], self.tranArr[i][0]) for i in range(len(atmFileArr))}
-            for i in range(self.__nfiles):        
-                sub_dict = self.atmDict.items()[i::self.__nfiles]
-#                for k in self.atmDict.keys():
-#                    sub_dict[k] = self.atmDict[k]
-                pk.dump(sub_dict, open((self.pklDir +'atmDict_%d.pkl' % (i)), 'wb'))
-        else:
-            self.atmDict = {}
-            for i in range(self.__nfiles):
-                sub_dict = pk.load(open((self.pklDir+'atmDict_%d.pkl' % (i)), 'rb'))
-                self.atmDict.update(sub_dict)
+        #The binary ATM store is only needed when no custom atmosphere is provided
+        if self.__generate or not self.atmFile: self.atm = at.Atmosphere(self.__log, self.atmDir, generate=self.__generate)
+        else:                                   self.atm = None
+        if self.atmFile: self.__log.log('Using provided ATM file %s -- ignoring sampled PWV and elevation' % (self.atmFile), 1)
+        else:            self.__log.log('Loading ATM cells on demand, keeping at most %d per frequency grid' % (self.__maxCells), 2)
 
     def __initATMDist(self):
         self.__cdfDict    = pk.load(open(self.pklDir+'pwv_cdf.pkl'))
         self.__pdfDict    = {float(self.__cdfDict['pwv'][i]):       np.gradient(self.__cdfDict['cdf'],    np.diff(self.__cdfDict['pwv'])[0])[i]    for i in range(len(self.__cdfDict['pwv']   ))}
+        self.__pwvVals    = np.array(sorted(self.__pdfDict.keys()))
+        self.__pwvProb    = np.array([self.__pdfDict[k] for k in self.__pwvVals]); self.__pwvProb = self.__pwvProb/np.sum(self.__pwvProb)
 
         self.__maxCdfDict = pk.load(open(self.pklDir+'pwvmax_pdf.pkl'))
         self.__maxPdfDict = {float(self.__maxCdfDict['pwvmax'][i]): np.gradient(self.__maxCdfDict['pdf'], np.diff(self.__maxCdfDict['pwvmax'])[0])[i] for i in range(len(self.__maxCdfDict['pwvmax']))}
@@ -6,9 +6,10 @@ import glob         as gb
 import units        as un
 import sky          as sk
 import scanStrategy as sc
+import weather      as wt
 
 class Telescope:
-    def __init__(self, log, dir, fgndDict=None, nrealize=1, nobs=1, clcDet=1, elv=None, pwv=None, specRes=1.e9, foregrounds=False):
+    def __init__(self, log, dir, fgndDict=None, nrealize=1, nobs=1, clcDet=1, elv=None, pwv=None, specRes=1.e9, foregrounds=False, quad=None, dtype=np.float64):
         self.log        = log
         self.dir        = dir
         self.configDir  = dir+'config/'
@@ -28,19 +29,6 @@ class Telescope:
         self.obsEff     = samp(pr.Parameter(dict['Observation Efficiency']),       pos=True, norm=True)
         self.netMgn     = samp(pr.Parameter(dict['NET Margin']),                   pos=True)
 
-        #Store sky object
-        atmFile = sorted(gb.glob(self.configDir+'/atm*.txt'))
-        if len(atmFile) == 0:
-            atmFile = None
-            self.log.log("No custom atmosphere provided; using Atacama MERRA AM-simulated sky", 1)
-        elif len(atmFile) > 1:
-            atmFile = None
-            self.log.log('More than one atm file found in %s; ignoring them all' % (self.configDir), 2)
-        else:
-            atmFile = atmFile[0]
-            self.log.log("Using custom atmosphere defined in %s" % (atmFile), 2)
-        self.sky = sk.Sky(self.log, nrealize=1, fgndDict=fgndDict, atmFile=atmFile, pwv=pwv, generate=False, foregrounds=foregrounds)
-
         #Store scan strategy object
         scanFile = sorted(gb.glob(self.configDir+'/elevation.txt'))
         if len(scanFile) == 0:
@@ -56,6 +44,22 @@ class Telescope:
             self.log.log("Using scan strategy defined in %s" % (scanFile), 2)
         self.scn = sc.ScanStrategy(self.log, scanDict=scanDict, elv=elv)
 
+        #Store sky object
+        atmFile = sorted(gb.glob(self.configDir+'/atm*.txt'))
+        if len(atmFile) == 0:
+            atmFile = None
+            self.log.log("No custom atmosphere provided; using Atacama MERRA AM-simulated sky", 1)
+        elif len(atmFile) > 1:
+            atmFile = None
+            self.log.log('More than one atm file found in %s; ignoring them all' % (self.configDir), 2)
+        else:
+            atmFile = atmFile[0]
+            self.log.log("Using custom atmosphere defined in %s" % (atmFile), 2)
+        self.sky = sk.Sky(self.log, nrealize=1, fgndDict=fgndDict, atmFile=atmFile, pwv=pwv, scn=self.scn, generate=False, foregrounds=foregrounds)
+
+        #Store weather sampler object
+        self.wth = wt.Weather(self.log, self.sky, self.scn, quad=quad)
+
         #Store camera objects
         cameraDirs   = sorted(gb.glob(dir+'/*/')); cameraDirs = [x for x in cameraDirs if 'config' not in x]
-        self.cameras = [cm.Camera(self.log, dir, self.sky, self.scn, nrealize=nrealize, nobs=nobs, clcDet=clcDet, specRes=specRes) for dir in cameraDirs]
+        self.cameras = [cm.Camera(self.log, dir, self.sky, self.scn, wth=self.wth, nrealize=nrealize, nobs=nobs, clcDet=clcDet, specRes=specRes, dtype=dtype) for dir in cameraDirs]
@@ -0,0 +1,53 @@
+#python Version 2.7.2
+import numpy as np
+
+#Class for drawing (PWV, elevation) pairs from inverse CDFs that are built once
+class Weather:
+    def __init__(self, log, sky, scn, quad=None):
+        self.log  = log
+        self.sky  = sky
+        self.scn  = scn
+        self.quad = quad
+
+        #Inverse CDFs of the PWV and elevation distributions
+        self.pwvVals, pwvProb = self.sky.pwvDist()
+        self.elvVals, elvProb = self.scn.elvDist()
+        self.pwvCdf = np.cumsum(pwvProb); self.pwvCdf = self.pwvCdf/self.pwvCdf[-1]
+        self.elvCdf = np.cumsum(elvProb); self.elvCdf = self.elvCdf/self.elvCdf[-1]
+
+    #***** Public Methods *****
+    #Draw PWV [mm] and elevation [deg] for nsample observations in one call
+    def sample(self, nsample=1):
+        pwv = self.__draw(self.pwvVals, self.pwvCdf, nsample)
+        elv = self.__draw(self.elvVals, self.elvCdf, nsample)
+        if np.any(pwv < self.sky.minPWV) or np.any(pwv > self.sky.maxPWV):
+            self.log.log('Clipping %d sampled PWVs to [%.1f, %.1f]' % (np.sum((pwv < self.sky.minPWV) | (pwv > self.sky.maxPWV)), self.sky.minPWV, self.sky.maxPWV), 2)
+            pwv = np.clip(pwv, self.sky.minPWV, self.sky.maxPWV)
+        return pwv, elv
+
+    #Weighted (PWV, elevation) states that integrate over the weather deterministically:
+    #every elevation of the scan strategy times the discrete PWV values, optionally merged into npwv groups
+    def quadrature(self, npwv=None):
+        if npwv is None: npwv = self.quad
+        elvProb = np.diff(np.concatenate([[0.], self.elvCdf]))
+        elvVals = self.elvVals[elvProb > 0.]; elvProb = elvProb[elvProb > 0.]
+        pwvProb = np.diff(np.concatenate([[0.], self.pwvCdf]))
+        pwvVals = np.clip(self.pwvVals[pwvProb > 0.].astype(np.float), self.sky.minPWV, self.sky.maxPWV)
+        pwvProb = pwvProb[pwvProb > 0.]
+        if npwv is not None and int(npwv) < len(pwvVals) and np.ptp(pwvVals) > 0.:
+            #Merge the PWV values into groups of equal width in sqrt(PWV), which resolves the high-PWV tail, each represented by its conditional mean
+            root    = np.sqrt(pwvVals)
+            grp     = np.clip(((root - root.min())/np.ptp(root)*int(npwv)).astype(np.int), 0, int(npwv) - 1)
+            grpProb = np.bincount(grp, weights=pwvProb,         minlength=int(npwv))
+            grpVals = np.bincount(grp, weights=pwvProb*pwvVals, minlength=int(npwv))
+            pwvVals = grpVals[grpProb > 0.]/grpProb[grpProb > 0.]; pwvProb = grpProb[grpProb > 0.]
+        pwv = np.tile(  pwvVals, len(elvVals))
+        elv = np.repeat(elvVals, len(pwvVals))
+        wgt = np.outer(elvProb, pwvProb).flatten()
+        self.log.log('Integrating over %d weather states (%d elevations x %d PWVs)' % (len(wgt), len(elvVals), len(pwvVals)), 2)
+        return pwv, elv, wgt/np.sum(wgt)
+
+    #***** Private Methods *****
+    def __draw(self, vals, cdf, nsample):
+        if len(vals) == 1: return np.repeat(vals, nsample).astype(np.float)
+        return vals[np.searchsorted(cdf, np.random.random_sample(nsample), side='right')]
@@ -0,0 +1,65 @@
+#python Version 2.7.2
+import os, sys, tempfile, unittest
+import numpy as np
+
+srcDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if srcDir not in sys.path: sys.path.insert(0, srcDir)
+import log        as lg
+import experiment as ex
+import calculate  as cl
+import physics    as ph
+import kernels    as kr
+
+expDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Experiments', 'SimonsObservatory', 'V3_baseline', '')
+
+#Numba kernels against the NumPy kernels on a small channel
+@unittest.skipIf(kr.nb is None, 'numba is not installed')
+class TestKernels(unittest.TestCase):
+    rtol = 1.e-10
+
+    def setUp(self):
+        self.logFile = tempfile.mkstemp(suffix='.txt')[1]
+        self.log     = lg.Log(self.logFile, 0)
+
+    def tearDown(self):
+        kr.setBackend('numpy')
+        os.remove(self.logFile)
+
+    #Loading table and sensitivity with the spectrum cache emptied, so that every spectrum comes from the active kernels
+    def loading(self, backend):
+        kr.setBackend(backend)
+        ph.specCache.clear()
+        np.random.seed(1)
+        exp = ex.Experiment(self.log, expDir, nrealize=1, nobs=4, clcDet=3, specRes=1.e9)
+        clc = cl.Calculate(self.log, exp, True)
+        ch  = exp.telescopes[0].cameras[0].channels[0]
+        return clc.calcLoading(ch, exp.telescopes[0])
+
+    def testSpectra(self):
+        phys = ph.Physics()
+        freq = np.linspace(20.e9, 300.e9, 57)
+        temp = np.linspace(2.7, 300., 57)
+        kr.setBackend('numpy'); ref = [phys.bbPowSpec(freq, temp, 0.3), phys.aniPowSpec(freq, temp, 0.3)]
+        kr.setBackend('numba'); out = [phys.bbPowSpec(freq, temp, 0.3), phys.aniPowSpec(freq, temp, 0.3)]
+        for r, o in zip(ref, out): np.testing.assert_allclose(o, r, rtol=self.rtol)
+
+    def testIntegrals(self):
+        freq = np.linspace(20.e9, 300.e9, 57)
+        popt = np.random.RandomState(1).uniform(0., 1.e-21, (4, 3, 57))
+        kr.setBackend('numpy'); ref = [kr.trapz(popt, freq), kr.photonNEP(popt, popt**2, freq, ph.Physics().h)]
+        kr.setBackend('numba'); out = [kr.trapz(popt, freq), kr.photonNEP(popt, popt**2, freq, ph.Physics().h)]
+        for r, o in zip(ref, out): np.testing.assert_allclose(o, r, rtol=self.rtol)
+
+    #Means and their spreads agree to rtol of the mean's magnitude, since entries that cancel to rounding noise carry no relative precision
+    def testChannel(self):
+        ref = self.loading('numpy')
+        out = self.loading('numba')
+        for (rMeans, rStds), (oMeans, oStds) in zip(ref, out):
+            for rMean, rStd, oMean, oStd in zip(rMeans, rStds, oMeans, oStds):
+                rMean = np.asarray(rMean, dtype=np.float)
+                atol  = self.rtol*np.max(np.abs(rMean[np.isfinite(rMean)]), initial=0.)
+                np.testing.assert_allclose(np.asarray(oMean, dtype=np.float), rMean,                           rtol=self.rtol, atol=atol)
+                np.testing.assert_allclose(np.asarray(oStd,  dtype=np.float), np.asarray(rStd, dtype=np.float), rtol=self.rtol, atol=atol)
+
+if __name__ == '__main__':
+    unittest.main()
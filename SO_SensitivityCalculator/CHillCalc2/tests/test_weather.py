@@ -0,0 +1,60 @@
+#python Version 2.7.2
+import os, sys, tempfile, unittest
+import numpy as np
+
+srcDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+if srcDir not in sys.path: sys.path.insert(0, srcDir)
+import log        as lg
+import experiment as ex
+import calculate  as cl
+
+expDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Experiments', 'SimonsObservatory', 'V3_baseline', '')
+
+#Weather quadrature against a large seeded Monte Carlo of the same weather draws
+class TestQuadrature(unittest.TestCase):
+    nmc   = 200000
+    chunk = 2000
+    tol   = 1.e-3 #Allowed relative error of the quadrature, on top of three Monte Carlo standard errors
+
+    @classmethod
+    def setUpClass(cls):
+        cls.logFile = tempfile.mkstemp(suffix='.txt')[1]
+        np.random.seed(1)
+        exp     = ex.Experiment(lg.Log(cls.logFile, 0), expDir, nrealize=1, nobs=1, clcDet=1, specRes=0.1e9)
+        cls.tp  = exp.telescopes[0]
+        cls.clc = cl.Calculate(cls.tp.log, exp, True)
+
+        #Monte Carlo weather, drawn in chunks to bound the memory of each stream call
+        np.random.seed(2)
+        draws   = [cls.tp.wth.sample(cls.chunk) for i in range(cls.nmc//cls.chunk)]
+        cls.pwv = np.concatenate([d[0] for d in draws])
+        cls.elv = np.concatenate([d[1] for d in draws])
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.logFile)
+
+    def streamNET(self, ch, pwvs, elvs):
+        return np.concatenate([self.clc.sens.stream(ch, self.tp, pwvs[i:i+self.chunk], elvs[i:i+self.chunk])[3] for i in range(0, len(pwvs), self.chunk)])
+
+    def assertClose(self, qd, mc, msg=None):
+        sem = np.std(mc)/np.sqrt(len(mc))/np.mean(mc)
+        self.assertLess(abs(qd/np.mean(mc) - 1.), self.tol + 3.*sem, msg)
+
+    def testMeanPWV(self):
+        for npwv in [None, 8]:
+            pwv, elv, wgt = self.tp.wth.quadrature(npwv)
+            self.assertAlmostEqual(np.sum(wgt), 1.)
+            self.assertClose(np.sum(wgt*pwv), self.pwv)
+
+    def testMeanNET(self):
+        for cm in self.tp.cameras:
+            for ch in cm.channels:
+                mc = self.streamNET(ch, self.pwv, self.elv)
+                for npwv in [None, 8]:
+                    pwv, elv, wgt = self.tp.wth.quadrature(npwv)
+                    qd = np.average(self.streamNET(ch, pwv, elv), weights=wgt)
+                    self.assertClose(qd, mc, '%s: quadrature NET %.4e vs Monte Carlo %.4e' % (ch.name, qd, np.mean(mc)))
+
+if __name__ == '__main__':
+    unittest.main()